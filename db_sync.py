@@ -1,20 +1,73 @@
 import psycopg2
-from psycopg2 import Error
+from psycopg2 import Error, OperationalError, InterfaceError, errorcodes, pool, sql
+from psycopg2.extras import execute_values, RealDictCursor
 import os
+import json
 import logging
-from typing import Optional
+import logging.handlers
+import threading
+import hashlib
+import select
+import weakref
+import datetime
+from decimal import Decimal
+from io import BytesIO, StringIO
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, BinaryIO, Iterator, Iterable
+from urllib.parse import quote
+from uuid import UUID, uuid4
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library json module if orjson is not installed
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    # The Arrow functions are only available with pyarrow installed
+    pyarrow = None
+
+try:
+    import adbc_driver_postgresql.dbapi as adbc
+except ImportError:
+    # Arrow export and ingest additionally need the ADBC PostgreSQL driver
+    adbc = None
 
 # Configure logging
+# File output is buffered in memory and written in blocks of 1024 records (or immediately on WARNING and above)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# The buffered records are formatted by the file handler itself, so it needs the format as well
+_log_file_handler = logging.handlers.RotatingFileHandler("db_sync.log", maxBytes=10 << 20, backupCount=5)
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=(os.getenv("LOG_LEVEL") or "INFO").upper(),
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler("db_sync.log"),
+        logging.handlers.MemoryHandler(1024, flushLevel=logging.WARNING, target=_log_file_handler),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Characters that must be backslash-escaped in PostgreSQL COPY text format
+COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# Shared connection pool, created once by init_pool() or lazily on the first acquire()
+_POOL: Optional[pool.ThreadedConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+# Cursors kept open on each connection for reuse across calls, by cursor class
+# (a cursor references its connection, so entries are removed explicitly by close_cursors)
+_CURSORS: dict[psycopg2.extensions.connection, dict[type, psycopg2.extensions.cursor]] = {}
+_CURSORS_LOCK = threading.Lock()
+
+# Names of the server-side prepared statements created on each connection
+_PREPARED_STATEMENTS: "weakref.WeakKeyDictionary[psycopg2.extensions.connection, set[str]]" = weakref.WeakKeyDictionary()
+
 def connect_to_postgres(dbname: str = None, user: str = None, password: str = None, host: str = "localhost", port: str = "5432") -> Optional[psycopg2.extensions.connection]:
     """
     Establish a connection to a PostgreSQL database using environment variables as defaults.
@@ -44,38 +97,360 @@ def connect_to_postgres(dbname: str = None, user: str = None, password: str = No
         logger.error(f"Error connecting to PostgreSQL database: {e}")
         return None
 
-def query_table(connection: psycopg2.extensions.connection, table_name: str) -> list:
+def init_pool(minconn: int = 1, maxconn: int = 8, dbname: str = None, user: str = None, password: str = None, host: str = "localhost", port: str = "5432") -> Optional[pool.ThreadedConnectionPool]:
     """
-    Query all information from a specified table in the PostgreSQL database.
+    Initialize the shared thread-safe connection pool, using the same environment variable defaults as connect_to_postgres.
+    Calling it again after the pool exists returns the existing pool.
+    
+    Parameters:
+    - minconn (int): The number of connections opened up front and kept in the pool (default: 1).
+    - maxconn (int): The maximum number of connections the pool will hand out (default: 8).
+    - dbname, user, password, host, port: Connection settings, as for connect_to_postgres.
+    
+    Returns:
+    - pool: The ThreadedConnectionPool, or None if it could not be created.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            try:
+                _POOL = pool.ThreadedConnectionPool(
+                    minconn,
+                    maxconn,
+                    dbname=dbname or os.getenv("DB_NAME"),
+                    user=user or os.getenv("DB_USER"),
+                    password=password or os.getenv("DB_PASSWORD"),
+                    host=host if host != "localhost" else os.getenv("DB_HOST", "localhost"),
+                    port=port if port != "5432" else os.getenv("DB_PORT", "5432")
+                )
+                logger.info(f"Initialized PostgreSQL connection pool (min {minconn}, max {maxconn}).")
+            except Error as e:
+                logger.error(f"Error initializing PostgreSQL connection pool: {e}")
+                return None
+        return _POOL
+
+def close_pool() -> None:
+    """Close all connections in the shared connection pool, if it exists."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            close_cursors()
+            _POOL.closeall()
+            _POOL = None
+            logger.info("PostgreSQL connection pool closed.")
+
+@contextmanager
+def acquire() -> Iterator[psycopg2.extensions.connection]:
+    """
+    Check a connection out of the shared pool and return it when the block exits.
+    The connection is probed with SELECT 1 on checkout and replaced once if it turns out to be dead.
+    
+    Yields:
+    - connection: A live connection object to the PostgreSQL database.
+    
+    Raises:
+    - PoolError: If the pool could not be initialized or is exhausted.
+    """
+    connection_pool = _POOL or init_pool()
+    if connection_pool is None:
+        raise pool.PoolError("connection pool is not initialized")
+    connection = connection_pool.getconn()
+    try:
+        if connection.closed:
+            raise InterfaceError("connection already closed")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1;")
+    except (OperationalError, InterfaceError) as e:
+        logger.warning(f"Dropping dead pooled connection: {e}")
+        close_cursors(connection)
+        connection_pool.putconn(connection, close=True)
+        connection = connection_pool.getconn()
+    try:
+        yield connection
+    finally:
+        connection_pool.putconn(connection)
+
+def get_cursor(connection: psycopg2.extensions.connection, cursor_factory: type = psycopg2.extensions.cursor) -> psycopg2.extensions.cursor:
+    """
+    Return the cursor of the given class kept open on a connection, creating it on first use
+    or after it has been closed (e.g. because the connection dropped).
+    Reusing one cursor per connection avoids allocating and tearing down a cursor in every polling cycle.
     
     Parameters:
     - connection: A connection object to the PostgreSQL database.
+    - cursor_factory (type): The cursor class, e.g. RealDictCursor (default: a plain tuple cursor).
+    
+    Returns:
+    - cursor: An open cursor on the connection.
+    """
+    with _CURSORS_LOCK:
+        cursors = _CURSORS.setdefault(connection, {})
+    cursor = cursors.get(cursor_factory)
+    if cursor is None or cursor.closed:
+        cursor = connection.cursor(cursor_factory=cursor_factory)
+        cursors[cursor_factory] = cursor
+    return cursor
+
+def close_cursors(connection: Optional[psycopg2.extensions.connection] = None) -> None:
+    """
+    Close and forget the cursors kept open by get_cursor. Call it before closing a connection.
+    
+    Parameters:
+    - connection: The connection whose cursors to close, or None for every connection.
+    """
+    with _CURSORS_LOCK:
+        connections = list(_CURSORS) if connection is None else [connection]
+        for conn in connections:
+            for cursor in _CURSORS.pop(conn, {}).values():
+                if not cursor.closed:
+                    cursor.close()
+
+def identifier(name: str) -> sql.Identifier:
+    """Quote a table or column name, which may be schema-qualified (e.g. "public.events"), as an SQL identifier."""
+    return sql.Identifier(*name.split("."))
+
+@lru_cache(maxsize=128)
+def select_all_sql(table_name: str) -> sql.Composed:
+    """Build (once per table) the query selecting every row of a table."""
+    return sql.SQL("SELECT * FROM {};").format(identifier(table_name))
+
+@lru_cache(maxsize=128)
+def select_max_sql(table_name: str, column_name: str) -> sql.Composed:
+    """Build (once per table and column) the query reading the maximum of a column as max_value."""
+    return sql.SQL("SELECT max({}) AS max_value FROM {};").format(identifier(column_name), identifier(table_name))
+
+@lru_cache(maxsize=128)
+def insert_sql(table_name: str, columns: tuple[str, ...]) -> sql.Composed:
+    """Build (once per table and column list) the multi-row INSERT statement used with execute_values."""
+    return sql.SQL("INSERT INTO {} ({}) VALUES %s;").format(identifier(table_name), sql.SQL(', ').join(map(identifier, columns)))
+
+@lru_cache(maxsize=128)
+def copy_to_sql(table_name: str) -> sql.Composed:
+    """Build (once per table) the binary COPY TO STDOUT statement for a whole table."""
+    return sql.SQL("COPY {} TO STDOUT WITH (FORMAT BINARY);").format(identifier(table_name))
+
+@lru_cache(maxsize=128)
+def copy_from_sql(table_name: str, columns: tuple[str, ...]) -> sql.Composed:
+    """Build (once per table and column list) the text-format COPY FROM STDIN statement."""
+    return sql.SQL("COPY {} ({}) FROM STDIN;").format(identifier(table_name), sql.SQL(', ').join(map(identifier, columns)))
+
+def query_table(connection: Optional[psycopg2.extensions.connection], table_name: str) -> list:
+    """
+    Query all information from a specified table in the PostgreSQL database.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
     - table_name (str): The name of the table to query.
     
     Returns:
-    - list: A list of tuples containing the rows of data from the table.
+    - list: A list of dictionaries mapping column names to values, one per row.
     """
-    cursor = None
+    if connection is None:
+        with acquire() as pooled:
+            return query_table(pooled, table_name)
     try:
-        cursor = connection.cursor()
-        query = f"SELECT * FROM {table_name};"
-        cursor.execute(query)
+        cursor = get_cursor(connection, RealDictCursor)
+        cursor.execute(select_all_sql(table_name))
         rows = cursor.fetchall()
         logger.info(f"Successfully retrieved {len(rows)} rows from table {table_name}.")
         return rows
     except Error as e:
         logger.error(f"Error querying table {table_name}: {e}")
         return []
-    finally:
-        if cursor:
-            cursor.close()
 
-def query_new_rows(connection: psycopg2.extensions.connection, table_name: str, column_name: str = "id", last_value: Optional[int] = None, timestamp_column: Optional[str] = None, time_duration: Optional[str] = None) -> tuple[list, Optional[int]]:
+@lru_cache(maxsize=128)
+def new_rows_sql(table_name: str, column_name: str, timestamp_column: Optional[str], since_last_value: bool) -> sql.Composed:
+    """Build (once per combination of filters) the SELECT returned by new_rows_query."""
+    fields = {'table': identifier(table_name), 'column': identifier(column_name)}
+    newer = "SELECT * FROM {table} WHERE {column} > %s AND {column} <= %s"
+    if timestamp_column:
+        fields['timestamp'] = identifier(timestamp_column)
+        updated = "SELECT * FROM {table} WHERE {timestamp} >= NOW() - %s::interval AND {column} <= %s"
+        # The second branch only picks up rows the first branch skipped, so no deduplication is needed
+        query = f"{newer} UNION ALL {updated}" if since_last_value else updated
+    else:
+        query = newer if since_last_value else "SELECT * FROM {table} WHERE {column} <= %s"
+    return sql.SQL(query + " ORDER BY {column}").format(**fields)
+
+def new_rows_query(table_name: str, column_name: str, last_value: Optional[int], timestamp_column: Optional[str], time_duration: Optional[str], max_value: int) -> tuple[sql.Composed, list]:
     """
-    Query newly added or updated rows from a specified table in the PostgreSQL database.
+    Build the SELECT used by query_new_rows and copy_new_rows.
+    When both filters are given, "newer than last_value OR touched within time_duration" is expressed as a
+    UNION ALL of two disjoint branches, so each branch can use its own index instead of one scan over a disjunction.
+    Every branch is bounded by max_value so the result matches the watermark returned to the caller.
+    For this to avoid sequential scans, both column_name and timestamp_column should be indexed.
+    
+    Parameters:
+    - table_name (str): The name of the table to query.
+    - column_name (str): The column used for identifying new rows.
+    - last_value: The last known value of column_name, or None.
+    - timestamp_column (str): The column used for identifying updated rows, or None.
+    - time_duration (str): The look-back interval for updated rows, or None.
+    - max_value: The current maximum of column_name, used as an upper bound.
+    
+    Returns:
+    - tuple: (composed query without a trailing semicolon, list of query parameters).
+    """
+    since_last_value = last_value is not None
+    if timestamp_column and time_duration:
+        query = new_rows_sql(table_name, column_name, timestamp_column, since_last_value)
+        if since_last_value:
+            return query, [last_value, max_value, time_duration, min(last_value, max_value)]
+        return query, [time_duration, max_value]
+    query = new_rows_sql(table_name, column_name, None, since_last_value)
+    if since_last_value:
+        return query, [last_value, max_value]
+    return query, [max_value]
+
+def install_notify_trigger(connection: Optional[psycopg2.extensions.connection], table_name: str, channel: str = "db_sync") -> bool:
+    """
+    Install a trigger that sends NOTIFY on the given channel after every INSERT or UPDATE statement on a table,
+    so clients can wait with wait_for_notifications instead of polling query_new_rows on a schedule.
+    The trigger fires once per statement with an empty payload, and PostgreSQL folds identical notifications
+    within a transaction into one; the listener then fetches the new rows with query_new_rows.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to watch.
+    - channel (str): The notification channel (default: 'db_sync').
+    
+    Returns:
+    - bool: True if the trigger was installed successfully, False otherwise.
+    """
+    if connection is None:
+        with acquire() as pooled:
+            return install_notify_trigger(pooled, table_name, channel)
+    try:
+        cursor = get_cursor(connection)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION db_sync_notify() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify(TG_ARGV[0], '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        cursor.execute(sql.SQL("DROP TRIGGER IF EXISTS db_sync_notify ON {};").format(identifier(table_name)))
+        cursor.execute(sql.SQL(
+            "CREATE TRIGGER db_sync_notify AFTER INSERT OR UPDATE ON {} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION db_sync_notify({});"
+        ).format(identifier(table_name), sql.Literal(channel)))
+        connection.commit()
+        logger.info(f"Installed notify trigger on table {table_name} for channel {channel}.")
+        return True
+    except Error as e:
+        logger.error(f"Error installing notify trigger on table {table_name}: {e}")
+        connection.rollback()
+        return False
+
+def listen(connection: psycopg2.extensions.connection, channel: str = "db_sync") -> bool:
+    """
+    Subscribe a dedicated connection to a notification channel.
+    The connection is switched to autocommit so notifications are delivered as soon as they arrive;
+    it should not be a pooled connection, since the subscription lasts for the whole session.
     
     Parameters:
     - connection: A connection object to the PostgreSQL database.
+    - channel (str): The notification channel (default: 'db_sync').
+    
+    Returns:
+    - bool: True if the connection is listening, False otherwise.
+    """
+    try:
+        connection.autocommit = True
+        get_cursor(connection).execute(sql.SQL("LISTEN {};").format(sql.Identifier(channel)))
+        logger.info(f"Listening for notifications on channel {channel}.")
+        return True
+    except Error as e:
+        logger.error(f"Error listening on channel {channel}: {e}")
+        return False
+
+def wait_for_notifications(connection: psycopg2.extensions.connection, timeout: float) -> list:
+    """
+    Block until at least one notification arrives on a listening connection or the timeout expires,
+    then drain every pending notification so a burst of changes results in a single query_new_rows call.
+    
+    Parameters:
+    - connection: A connection object subscribed with listen().
+    - timeout (float): The maximum number of seconds to wait.
+    
+    Returns:
+    - list: The received psycopg2 Notify objects, empty if the timeout expired or an error occurred.
+    """
+    try:
+        if select.select([connection], [], [], timeout) == ([], [], []):
+            return []
+        connection.poll()
+        notifications = list(connection.notifies)
+        connection.notifies.clear()
+        logger.debug("Received %d notifications.", len(notifications))
+        return notifications
+    except (Error, OSError) as e:
+        logger.error(f"Error waiting for notifications: {e}")
+        return []
+
+def watermark_unchanged(last_value: Optional[int], max_value: int, timestamp_column: Optional[str], time_duration: Optional[str]) -> bool:
+    """Tell whether new_rows_query is known to return no rows, so polling can skip running it."""
+    # Updated rows can appear below the watermark, so only skip when there is no timestamp filter
+    return last_value is not None and max_value <= last_value and not (timestamp_column and time_duration)
+
+def execute_prepared(cursor: psycopg2.extensions.cursor, query, params: list) -> None:
+    """
+    Execute a query through a server-side prepared statement, creating it on first use per connection.
+    The server then parses and plans the query once per session instead of on every polling cycle.
+    If the table's columns changed since the statement was prepared (PostgreSQL then rejects a prepared
+    SELECT * with "cached plan must not change result type"), the statement is deallocated, prepared
+    again and executed once more; this rolls back the current transaction.
+    Keep in sync with db_sync_client.execute_prepared.
+    
+    Parameters:
+    - cursor: The cursor to execute the statement with.
+    - query: The query (str or psycopg2.sql Composable) using %s placeholders, without a trailing semicolon.
+    - params (list): The query parameters.
+    """
+    if isinstance(query, sql.Composable):
+        query = query.as_string(cursor)
+    name = "db_sync_" + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    prepared = _PREPARED_STATEMENTS.setdefault(cursor.connection, set())
+    if name not in prepared:
+        # The session may already hold the statement, e.g. when reused through a session-pooling proxy
+        cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s;", (name,))
+        if cursor.fetchone() is None:
+            prepare_statement(cursor, name, query)
+        prepared.add(name)
+    try:
+        execute_statement(cursor, name, params)
+    except Error as e:
+        if e.pgcode != errorcodes.FEATURE_NOT_SUPPORTED:
+            raise
+        logger.info(f"Preparing statement {name} again after a change to the queried table: {e}")
+        cursor.connection.rollback()
+        cursor.execute(f"DEALLOCATE {name};")
+        prepare_statement(cursor, name, query)
+        execute_statement(cursor, name, params)
+
+def prepare_statement(cursor: psycopg2.extensions.cursor, name: str, query: str) -> None:
+    """Create a server-side prepared statement from a query with %s placeholders, numbering them $1, $2, ..."""
+    parts = query.split("%s")
+    numbered = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+    cursor.execute(f"PREPARE {name} AS {numbered};")
+
+def execute_statement(cursor: psycopg2.extensions.cursor, name: str, params: list) -> None:
+    """Execute a server-side prepared statement with the given parameters."""
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+    else:
+        cursor.execute(f"EXECUTE {name};")
+
+def query_new_rows(connection: Optional[psycopg2.extensions.connection], table_name: str, column_name: str = "id", last_value: Optional[int] = None, timestamp_column: Optional[str] = None, time_duration: Optional[str] = None) -> tuple[list, Optional[int]]:
+    """
+    Query newly added or updated rows from a specified table in the PostgreSQL database.
+    The current maximum of column_name is read first and used as an upper bound for the query,
+    which runs as a prepared statement so repeated polling reuses the server-side plan.
+    If the maximum has not moved past last_value (and no timestamp filter is set), the row query is skipped.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
     - table_name (str): The name of the table to query.
     - column_name (str): The column to use for identifying new rows (default: 'id').
     - last_value: The last known value of the column_name to compare against. 
@@ -85,36 +460,28 @@ def query_new_rows(connection: psycopg2.extensions.connection, table_name: str,
                            to look back for updated rows. Requires timestamp_column to be set.
     
     Returns:
-    - tuple: (list of tuples containing the new or updated rows of data from the table,
-              maximum value of the column_name from the queried rows, to be used as last_value in the next call).
+    - tuple: (list of dictionaries containing the new or updated rows of data from the table,
+              current maximum value of the column_name in the table, to be used as last_value in the next call).
     """
-    cursor = None
+    if connection is None:
+        with acquire() as pooled:
+            return query_new_rows(pooled, table_name, column_name, last_value, timestamp_column, time_duration)
     try:
-        cursor = connection.cursor()
-        conditions = []
-        params = []
-        
-        if last_value is not None:
-            conditions.append(f"{column_name} > %s")
-            params.append(last_value)
-            
-        if timestamp_column and time_duration:
-            conditions.append(f"{timestamp_column} >= NOW() - INTERVAL %s")
-            params.append(time_duration)
+        cursor = get_cursor(connection, RealDictCursor)
+        # Read the new watermark with a cheap aggregate instead of scanning the fetched rows in Python
+        cursor.execute(select_max_sql(table_name, column_name))
+        max_value = cursor.fetchone()['max_value']
+        if max_value is None:
+            logger.info(f"No rows found in table {table_name}.")
+            return [], None
+        if watermark_unchanged(last_value, max_value, timestamp_column, time_duration):
+            logger.info(f"No new or updated rows found in table {table_name}.")
+            return [], max_value
         
-        if conditions:
-            query = f"SELECT * FROM {table_name} WHERE {' OR '.join(conditions)} ORDER BY {column_name};"
-            cursor.execute(query, params)
-        else:
-            query = f"SELECT * FROM {table_name} ORDER BY {column_name};"
-            cursor.execute(query)
-            
+        query, params = new_rows_query(table_name, column_name, last_value, timestamp_column, time_duration, max_value)
+        execute_prepared(cursor, query, params)
         rows = cursor.fetchall()
-        max_value = None
-        if rows and len(rows) > 0:
-            # Assuming the column_name is in the first position if it's 'id', adjust if needed
-            col_index = 0  # Adjust based on table structure if necessary
-            max_value = max(row[col_index] for row in rows)
+        if rows:
             logger.info(f"Successfully retrieved {len(rows)} new or updated rows from table {table_name}.")
         else:
             logger.info(f"No new or updated rows found in table {table_name}.")
@@ -122,40 +489,368 @@ def query_new_rows(connection: psycopg2.extensions.connection, table_name: str,
     except Error as e:
         logger.error(f"Error querying new or updated rows from table {table_name}: {e}")
         return [], None
+
+def stream_table(connection: Optional[psycopg2.extensions.connection], table_name: str, batch_size: int = 10000) -> Iterator[dict]:
+    """
+    Stream all rows of a specified table through a server-side (named) cursor, batch_size rows per round trip,
+    so memory use stays constant regardless of the table size.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to query.
+    - batch_size (int): The number of rows fetched from the server at a time (default: 10000).
+    
+    Yields:
+    - dict: One dictionary mapping column names to values per row.
+    """
+    if connection is None:
+        with acquire() as pooled:
+            yield from stream_table(pooled, table_name, batch_size)
+        return
+    cursor = None
+    try:
+        # NO SCROLL: the rows are read forward once, so the server never has to keep them for backward fetches
+        cursor = connection.cursor(name=f"stream_{uuid4().hex}", cursor_factory=RealDictCursor, scrollable=False)
+        cursor.itersize = batch_size
+        cursor.execute(select_all_sql(table_name))
+        yield from cursor
+    except Error as e:
+        logger.error(f"Error streaming table {table_name}: {e}")
     finally:
         if cursor:
             cursor.close()
+        # Named cursors live inside a transaction; end it so no snapshot is held afterwards
+        if not connection.closed:
+            connection.rollback()
+
+def write_ndjson(rows: Iterable[dict], output: BinaryIO) -> int:
+    """
+    Write rows as newline-delimited JSON, one document per row, encoding each row as it is consumed
+    so no serialized copy of the whole result is built. Uses orjson when it is available.
+    Values without a native JSON representation (e.g. Decimal) are converted with str().
+    
+    Parameters:
+    - rows: The rows to write, e.g. from stream_table.
+    - output: A writable binary file-like object, ideally buffered (e.g. socket.makefile('wb', buffering=1 << 20))
+              so small row writes are batched into fewer system calls.
+    
+    Returns:
+    - int: The number of rows written.
+    """
+    count = 0
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE
+        for row in rows:
+            output.write(orjson.dumps(row, default=str, option=option))
+            count += 1
+    else:
+        for row in rows:
+            output.write(json.dumps(row, default=str).encode('utf-8') + b"\n")
+            count += 1
+    logger.info(f"Wrote {count} rows as NDJSON.")
+    return count
+
+def copy_table(connection: Optional[psycopg2.extensions.connection], table_name: str, output: Optional[BinaryIO] = None) -> bytes:
+    """
+    Export all rows from a specified table using COPY ... TO STDOUT in PostgreSQL binary format.
+    Rows are streamed by the server straight into the output object, so no Python tuple is built per row.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to export.
+    - output: A writable binary file-like object (e.g. a socket's makefile('wb')) to stream the data into.
+              If None, the data is collected in memory and returned.
+    
+    Returns:
+    - bytes: The binary COPY data if no output was given, otherwise empty bytes. Empty bytes on error.
+    """
+    if connection is None:
+        with acquire() as pooled:
+            return copy_table(pooled, table_name, output)
+    buffer = output if output is not None else BytesIO()
+    try:
+        cursor = get_cursor(connection)
+        cursor.copy_expert(copy_to_sql(table_name), buffer)
+        logger.info(f"Successfully copied table {table_name}.")
+        return buffer.getvalue() if output is None else b""
+    except Error as e:
+        logger.error(f"Error copying table {table_name}: {e}")
+        return b""
 
-def insert_row(connection: psycopg2.extensions.connection, table_name: str, row_data: dict) -> bool:
+def copy_new_rows(connection: Optional[psycopg2.extensions.connection], table_name: str, column_name: str = "id", last_value: Optional[int] = None, timestamp_column: Optional[str] = None, time_duration: Optional[str] = None, output: Optional[BinaryIO] = None) -> tuple[bytes, Optional[int]]:
+    """
+    Export newly added or updated rows from a specified table using COPY (SELECT ...) TO STDOUT in binary format.
+    Accepts the same filters as query_new_rows and builds the same query, bounded by the current maximum of
+    column_name, so rows committed in between are left for the next call.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to export.
+    - column_name (str): The column to use for identifying new rows (default: 'id').
+    - last_value: The last known value of the column_name to compare against.
+                  If None and no timestamp filter is provided, exports all rows.
+    - timestamp_column (str): The column to use for identifying updated rows based on timestamp.
+    - time_duration (str): The duration in PostgreSQL interval format (e.g., '1 hour', '30 minutes')
+                           to look back for updated rows. Requires timestamp_column to be set.
+    - output: A writable binary file-like object to stream the data into. If None, the data is returned.
+    
+    Returns:
+    - tuple: (binary COPY data if no output was given, otherwise empty bytes,
+              maximum value of the column_name covered by the export, to be used as last_value in the next call).
+    """
+    if connection is None:
+        with acquire() as pooled:
+            return copy_new_rows(pooled, table_name, column_name, last_value, timestamp_column, time_duration, output)
+    buffer = output if output is not None else BytesIO()
+    try:
+        cursor = get_cursor(connection)
+        cursor.execute(select_max_sql(table_name, column_name))
+        max_value = cursor.fetchone()[0]
+        if max_value is None:
+            logger.info(f"No rows found in table {table_name}.")
+            return b"", None
+        if watermark_unchanged(last_value, max_value, timestamp_column, time_duration):
+            logger.info(f"No new or updated rows found in table {table_name}.")
+            return b"", max_value
+        
+        query, params = new_rows_query(table_name, column_name, last_value, timestamp_column, time_duration, max_value)
+        select = cursor.mogrify(query, params)
+        cursor.copy_expert(b"COPY (" + select + b") TO STDOUT WITH (FORMAT BINARY);", buffer)
+        logger.info(f"Successfully copied new or updated rows from table {table_name} up to {column_name} {max_value}.")
+        return (buffer.getvalue() if output is None else b""), max_value
+    except Error as e:
+        logger.error(f"Error copying new or updated rows from table {table_name}: {e}")
+        return b"", None
+
+def insert_row(connection: Optional[psycopg2.extensions.connection], table_name: str, row_data: dict) -> bool:
     """
     Insert a row of data into a specified table in the PostgreSQL database.
     
     Parameters:
-    - connection: A connection object to the PostgreSQL database.
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
     - table_name (str): The name of the table to insert data into.
     - row_data (dict): A dictionary where keys are column names and values are the data to insert.
     
     Returns:
     - bool: True if the insertion was successful, False otherwise.
     """
-    cursor = None
+    return insert_rows(connection, table_name, [row_data])
+
+def insert_rows(connection: Optional[psycopg2.extensions.connection], table_name: str, rows: list[dict], page_size: int = 1000) -> bool:
+    """
+    Insert multiple rows of data into a specified table in a single transaction.
+    Uses execute_values to send multi-row INSERT statements instead of one round trip per row.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to insert data into.
+    - rows (list[dict]): Dictionaries mapping column names to values. All rows must share the keys of the first row.
+    - page_size (int): The maximum number of rows sent per INSERT statement (default: 1000).
+    
+    Returns:
+    - bool: True if all rows were inserted successfully, False otherwise.
+    """
+    if not rows:
+        return True
+    if connection is None:
+        with acquire() as pooled:
+            return insert_rows(pooled, table_name, rows, page_size)
     try:
-        cursor = connection.cursor()
-        columns = ', '.join(row_data.keys())
-        placeholders = ', '.join(['%s'] * len(row_data))
-        values = tuple(row_data.values())
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders});"
-        cursor.execute(query, values)
+        cursor = get_cursor(connection)
+        keys = tuple(rows[0])
+        template = "(" + ", ".join(["%s"] * len(keys)) + ")"
+        values = [tuple(row[key] for key in keys) for row in rows]
+        execute_values(cursor, insert_sql(table_name, keys), values, template=template, page_size=page_size)
         connection.commit()
-        logger.info(f"Successfully inserted row into table {table_name}.")
+        logger.info(f"Successfully inserted {len(rows)} rows into table {table_name}.")
         return True
     except Error as e:
-        logger.error(f"Error inserting row into table {table_name}: {e}")
+        logger.error(f"Error inserting rows into table {table_name}: {e}")
         connection.rollback()
         return False
-    finally:
-        if cursor:
-            cursor.close()
+
+def format_copy_value(value) -> str:
+    """
+    Format a single Python value as a field in PostgreSQL COPY text format.
+    
+    Parameters:
+    - value: The value to format.
+    
+    Returns:
+    - str: The escaped field, or \\N for None.
+    
+    Raises:
+    - TypeError: If the value has no unambiguous COPY text representation (e.g. lists or dicts).
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float, Decimal, UUID)):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, str):
+        return value.translate(COPY_TEXT_ESCAPES)
+    raise TypeError(f"Cannot format value of type {type(value).__name__} for COPY")
+
+def bulk_load(connection: Optional[psycopg2.extensions.connection], table_name: str, rows: list[dict]) -> bool:
+    """
+    Load multiple rows into a specified table using COPY ... FROM STDIN in text format.
+    This avoids SQL parsing per row on the server and is the fastest ingest path for large batches.
+    Falls back to insert_rows if a row contains a value that cannot be formatted for COPY.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database, or None to use one from the shared pool.
+    - table_name (str): The name of the table to load data into.
+    - rows (list[dict]): Dictionaries mapping column names to values. All rows must share the keys of the first row.
+    
+    Returns:
+    - bool: True if all rows were loaded successfully, False otherwise.
+    """
+    if not rows:
+        return True
+    if connection is None:
+        with acquire() as pooled:
+            return bulk_load(pooled, table_name, rows)
+    keys = list(rows[0])
+    try:
+        lines = ["\t".join(format_copy_value(row[key]) for key in keys) for row in rows]
+    except TypeError as e:
+        logger.info(f"Falling back to INSERT for table {table_name}: {e}")
+        return insert_rows(connection, table_name, rows)
+    
+    try:
+        cursor = get_cursor(connection)
+        buffer = StringIO("\n".join(lines) + "\n")
+        cursor.copy_expert(copy_from_sql(table_name, tuple(keys)), buffer)
+        connection.commit()
+        logger.info(f"Successfully loaded {len(rows)} rows into table {table_name}.")
+        return True
+    except Error as e:
+        logger.error(f"Error loading rows into table {table_name}: {e}")
+        connection.rollback()
+        return False
+
+def postgres_uri(dbname: str = None, user: str = None, password: str = None, host: str = "localhost", port: str = "5432") -> str:
+    """
+    Build a postgresql:// connection URI (as used by ADBC) with the same environment variable defaults as connect_to_postgres.
+    
+    Parameters:
+    - dbname, user, password, host, port: Connection settings, as for connect_to_postgres.
+    
+    Returns:
+    - str: The connection URI.
+    """
+    dbname = dbname or os.getenv("DB_NAME", "")
+    user = user or os.getenv("DB_USER", "")
+    password = password or os.getenv("DB_PASSWORD", "")
+    host = host if host != "localhost" else os.getenv("DB_HOST", "localhost")
+    port = port if port != "5432" else os.getenv("DB_PORT", "5432")
+    credentials = quote(user, safe="") + (":" + quote(password, safe="") if password else "")
+    return f"postgresql://{credentials}@{host}:{port}/{quote(dbname, safe='')}"
+
+def quote_identifier(name: str) -> str:
+    """Quote a possibly schema-qualified table name for SQL run outside psycopg2 (e.g. through ADBC)."""
+    return ".".join('"' + part.replace('"', '""') + '"' for part in name.split("."))
+
+def query_table_arrow(table_name: str, uri: Optional[str] = None) -> Optional["pyarrow.Table"]:
+    """
+    Query all rows of a specified table into a columnar Arrow table through ADBC.
+    libpq results are decoded straight into Arrow buffers, so no Python object is created per row or value.
+    
+    Parameters:
+    - table_name (str): The name of the table to query.
+    - uri (str): The connection URI. Defaults to postgres_uri().
+    
+    Returns:
+    - pyarrow.Table: The table data, or None if ADBC is unavailable or the query fails.
+    """
+    if adbc is None:
+        logger.error("Arrow export requires the pyarrow and adbc_driver_postgresql packages.")
+        return None
+    try:
+        with adbc.connect(uri or postgres_uri()) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {quote_identifier(table_name)}")
+                table = cursor.fetch_arrow_table()
+        logger.info(f"Successfully retrieved {table.num_rows} rows from table {table_name} as Arrow.")
+        return table
+    except adbc.Error as e:
+        logger.error(f"Error querying table {table_name} as Arrow: {e}")
+        return None
+
+def write_arrow_stream(table: "pyarrow.Table", output: BinaryIO, max_chunksize: int = 65536) -> bool:
+    """
+    Write an Arrow table to a binary stream (e.g. a socket's makefile('wb')) in Arrow IPC streaming format.
+    
+    Parameters:
+    - table (pyarrow.Table): The table to write.
+    - output: A writable binary file-like object.
+    - max_chunksize (int): The maximum number of rows per record batch (default: 65536).
+    
+    Returns:
+    - bool: True if the table was written successfully, False otherwise.
+    """
+    if pyarrow is None:
+        logger.error("Arrow streams require the pyarrow package.")
+        return False
+    try:
+        with pyarrow.ipc.new_stream(output, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max_chunksize)
+        return True
+    except (pyarrow.ArrowException, OSError) as e:
+        logger.error(f"Error writing Arrow stream: {e}")
+        return False
+
+def read_arrow_stream(source: BinaryIO) -> Optional["pyarrow.Table"]:
+    """
+    Read an Arrow IPC stream written by write_arrow_stream back into a table.
+    
+    Parameters:
+    - source: A readable binary file-like object (e.g. a socket's makefile('rb')).
+    
+    Returns:
+    - pyarrow.Table: The table read from the stream, or None on error.
+    """
+    if pyarrow is None:
+        logger.error("Arrow streams require the pyarrow package.")
+        return None
+    try:
+        with pyarrow.ipc.open_stream(source) as reader:
+            return reader.read_all()
+    except (pyarrow.ArrowException, OSError) as e:
+        logger.error(f"Error reading Arrow stream: {e}")
+        return None
+
+def ingest_arrow(table_name: str, table: "pyarrow.Table", uri: Optional[str] = None) -> bool:
+    """
+    Append an Arrow table to a specified database table using ADBC bulk ingest, which loads the data with COPY.
+    
+    Parameters:
+    - table_name (str): The name of the table to load data into, optionally schema-qualified.
+    - table (pyarrow.Table): The data to load; its column names must match the target table.
+    - uri (str): The connection URI. Defaults to postgres_uri().
+    
+    Returns:
+    - bool: True if the data was loaded successfully, False otherwise.
+    """
+    if adbc is None:
+        logger.error("Arrow ingest requires the pyarrow and adbc_driver_postgresql packages.")
+        return False
+    schema_name, _, name = table_name.rpartition(".")
+    try:
+        with adbc.connect(uri or postgres_uri()) as connection:
+            with connection.cursor() as cursor:
+                cursor.adbc_ingest(name, table, mode="append", db_schema_name=schema_name or None)
+            connection.commit()
+        logger.info(f"Successfully loaded {table.num_rows} rows into table {table_name} from Arrow.")
+        return True
+    except adbc.Error as e:
+        logger.error(f"Error loading Arrow data into table {table_name}: {e}")
+        return False
 
 # Example usage
 if __name__ == "__main__":
@@ -164,13 +859,15 @@ if __name__ == "__main__":
         try:
             # Query a table
             results = query_table(conn, "your_table_name")
-            for row in results:
-                logger.info(f"Row data: {row}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for row in results:
+                    logger.debug("Row data: %s", row)
             
             # Query new rows
             new_rows, last_id = query_new_rows(conn, "your_table_name", "id", None)
-            for row in new_rows:
-                logger.info(f"New row: {row}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for row in new_rows:
+                    logger.debug("New row: %s", row)
             logger.info(f"Last ID queried: {last_id}")
             
             # Query new or updated rows within the last hour
@@ -182,10 +879,19 @@ if __name__ == "__main__":
                 timestamp_column="updated_at", 
                 time_duration="1 hour"
             )
-            for row in updated_rows:
-                logger.info(f"New or updated row within last hour: {row}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for row in updated_rows:
+                    logger.debug("New or updated row within last hour: %s", row)
             logger.info(f"Last ID queried for updates: {last_id_updated}")
             
+            # Export a table in binary COPY format
+            copy_data = copy_table(conn, "your_table_name")
+            logger.info(f"Copied {len(copy_data)} bytes of binary COPY data.")
+            
+            # Query through the shared connection pool instead of the dedicated connection
+            pooled_results = query_table(None, "your_table_name")
+            logger.info(f"Retrieved {len(pooled_results)} rows through the connection pool.")
+            
             # Insert a new row
             sample_data = {
                 "column1": "value1",
@@ -198,7 +904,9 @@ if __name__ == "__main__":
             else:
                 logger.warning("Row insertion failed.")
         finally:
+            close_cursors(conn)
             conn.close()
+            close_pool()
             logger.info("Connection closed.")
     else:
         logger.error("Failed to establish database connection.")
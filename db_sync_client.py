@@ -1,29 +1,174 @@
 import socket
+import ssl
+import select
 import json
+import struct
+import hashlib
+import weakref
+import pickle
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
-from psycopg2 import Error
+from psycopg2 import Error, errorcodes, sql
 import os
 import logging
-from typing import Optional
+import logging.handlers
+from functools import lru_cache
+from typing import Optional, Iterator, Iterable
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library json module if orjson is not installed
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    # Compression is optional; frames are sent uncompressed if zstandard is not installed
+    zstandard = None
+
+try:
+    import msgspec
+except ImportError:
+    # The MessagePack wire format is optional; frames are sent as JSON if msgspec is not installed
+    msgspec = None
+
 # Load environment variables from .env file if it exists
 load_dotenv()
 
 # Configure logging
+# File output is buffered in memory and written in blocks of 1024 records (or immediately on WARNING and above)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# The buffered records are formatted by the file handler itself, so it needs the format as well
+_log_file_handler = logging.handlers.RotatingFileHandler("db_sync_client.log", maxBytes=10 << 20, backupCount=5)
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=(os.getenv("LOG_LEVEL") or "INFO").upper(),
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler("db_sync_client.log"),
+        logging.handlers.MemoryHandler(1024, flushLevel=logging.WARNING, target=_log_file_handler),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Every message is prefixed with a 1-byte flags field and its length as an 8-byte big-endian unsigned integer
+FRAME_HEADER = struct.Struct('>BQ')
+
+# Frame flag: the message body is zstd-compressed
+FLAG_ZSTD = 0x01
+
+# Frame flag: the message body is MessagePack instead of JSON
+FLAG_MSGPACK = 0x02
+
+# A frame with an empty body marks the end of a sync, so the server can tell it from a dropped connection
+EOF_FRAME = (FRAME_HEADER.pack(0, 0), b"")
+
+# zstd compression of message bodies, enabled with COMPRESSION=zstd
+COMPRESSION = os.getenv("COMPRESSION", "none").lower()
+USE_ZSTD = zstandard is not None and COMPRESSION == "zstd"
+if COMPRESSION == "zstd" and not USE_ZSTD:
+    logger.warning("COMPRESSION=zstd requested but the zstandard package is not installed; sending uncompressed data.")
+
+# Binary MessagePack encoding of message bodies, enabled with WIRE_FORMAT=msgpack
+# (values msgspec cannot encode natively are converted with str(), as for JSON)
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "json").lower()
+MSGPACK_ENCODER = msgspec.msgpack.Encoder(enc_hook=str) if msgspec is not None and WIRE_FORMAT == "msgpack" else None
+if WIRE_FORMAT == "msgpack" and MSGPACK_ENCODER is None:
+    logger.warning("WIRE_FORMAT=msgpack requested but the msgspec package is not installed; sending JSON.")
+
+# Send the id column (the first column of each row) as the difference to the previous row's id, enabled with ID_DELTAS=true;
+# keyset batches are ordered by id, so the deltas are small numbers instead of full-width ids
+ID_DELTAS = os.getenv("ID_DELTAS", "false").lower() == "true"
+
+# Per-thread zstd compressors: a ZstdCompressor must not be used by several threads at once,
+# and frames are encoded concurrently by the prefetch threads of sharded syncs
+_ZSTD_STATE = threading.local()
+
+# Number of encoded batches the database reader may queue ahead of the socket sender
+PIPELINE_DEPTH = 4
+
+# File to store the last sent ID for persistence, as a decimal integer
+LAST_SENT_ID_FILE = "last_sent_id.txt"
+
+# Pickle file used for the last sent ID by earlier versions, read once if LAST_SENT_ID_FILE does not exist yet
+LEGACY_LAST_SENT_ID_FILE = "last_sent_id.pkl"
+
+# Names of the server-side prepared statements created on each source database connection
+_PREPARED_STATEMENTS: "weakref.WeakKeyDictionary[psycopg2.extensions.connection, set[str]]" = weakref.WeakKeyDictionary()
+
+# File to store the cached table schemas, so restarts do not have to query information_schema again
+SCHEMA_CACHE_FILE = "schema.pkl"
+
+# Table schemas by table name, with the catalog version they were read at (loaded from SCHEMA_CACHE_FILE on first use)
+_SCHEMA_CACHE: Optional[dict[str, tuple[str, list]]] = None
+_SCHEMA_CACHE_LOCK = threading.Lock()
+
+# Framed schema-only messages by table name, with the cached schema they were encoded from
+_SCHEMA_FRAMES: dict[str, tuple[list, tuple[bytes, bytes]]] = {}
+
+# Maximum TLS record payload; frames larger than this are written as several records
+TLS_RECORD_BYTES = 16 << 10
+
+# Kernel send buffer requested for the client socket, large enough for long-latency links
+SEND_BUFFER_BYTES = 4 << 20
+
+# TCP keepalive timing: probe after 60s idle, every 15s, give up after 4 missed probes
+KEEPALIVE_IDLE_SECONDS = 60
+KEEPALIVE_INTERVAL_SECONDS = 15
+KEEPALIVE_PROBE_COUNT = 4
+
+# Connection to the target server kept open between syncs, and the TLS session used to resume reconnects
+_SERVER_SOCKET: Optional[ssl.SSLSocket] = None
+_TLS_SESSION: Optional[ssl.SSLSession] = None
+
+def configure_socket(sock: socket.socket) -> None:
+    """
+    Tune a freshly created TCP socket for streaming sync payloads.
+    Disables Nagle's algorithm, enlarges the send buffer and enables TCP keepalive
+    (with Linux-specific probe timing where the platform supports it).
+    
+    Parameters:
+    - sock: The unconnected TCP socket to configure.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_BYTES)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE_SECONDS)
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL_SECONDS)
+    if hasattr(socket, "TCP_KEEPCNT"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_PROBE_COUNT)
+
+@lru_cache(maxsize=1)
+def tls_context(cert_file: str) -> ssl.SSLContext:
+    """
+    Build (once) the client TLS context trusting the given server certificate.
+    Sharing one context lets reconnects resume the previous TLS session, which must belong to the same context.
+    
+    Parameters:
+    - cert_file (str): Path to the server certificate to trust.
+    
+    Returns:
+    - SSLContext: The client TLS context.
+    """
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.load_verify_locations(cert_file)  # Trust the server's self-signed certificate
+    if hasattr(ssl, "OP_ENABLE_KTLS"):
+        # Let OpenSSL hand record encryption to the kernel (Linux kTLS) where supported, so sendall
+        # becomes plain socket writes; OpenSSL silently stays in user space otherwise
+        context.options |= ssl.OP_ENABLE_KTLS
+    return context
+
 def connect_to_tcp_server(host: str = "localhost", port: int = 443) -> Optional[socket.socket]:
     """
     Connect to a listening TCP socket on the specified host and port with TLS encryption.
+    Resumes the last TLS session seen by close_connection or drop_connection when the server accepts it,
+    which skips the full handshake.
     
     Parameters:
     - host (str): The host address of the server to connect to. Defaults to env var SERVER_HOST or "localhost".
@@ -32,23 +177,21 @@ def connect_to_tcp_server(host: str = "localhost", port: int = 443) -> Optional[
     Returns:
     - client_socket: The socket object if connection is successful, None otherwise.
     """
-    import ssl
-    
     host = host if host != "localhost" else os.getenv("SERVER_HOST", "localhost")
     port = port if port != 443 else int(os.getenv("SERVER_PORT", 443))
     try:
         # Create a TCP/IP socket
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        configure_socket(client_socket)
         
         # Wrap the socket with SSL/TLS
-        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-        cert_file = os.getenv("SERVER_CERT_FILE", "server.crt")
-        context.load_verify_locations(cert_file)  # Trust the server's self-signed certificate
-        client_socket = context.wrap_socket(client_socket, server_hostname=host)
+        context = tls_context(os.getenv("SERVER_CERT_FILE", "server.crt"))
+        client_socket = context.wrap_socket(client_socket, server_hostname=host, session=_TLS_SESSION)
         
         # Connect to the server
         client_socket.connect((host, port))
-        logger.info(f"Successfully connected to secure TLS server at {host}:{port}")
+        resumed = " (resumed TLS session)" if client_socket.session_reused else ""
+        logger.info(f"Successfully connected to secure TLS server at {host}:{port}{resumed}")
         return client_socket
     except Exception as e:
         logger.error(f"Error connecting to secure TLS server at {host}:{port}: {e}")
@@ -100,7 +243,8 @@ def query_table_schema(connection: psycopg2.extensions.connection, table_name: s
         query = """
             SELECT column_name, data_type 
             FROM information_schema.columns 
-            WHERE table_name = %s;
+            WHERE table_name = %s
+            ORDER BY ordinal_position;
         """
         cursor.execute(query, (table_name,))
         columns = cursor.fetchall()
@@ -114,107 +258,752 @@ def query_table_schema(connection: psycopg2.extensions.connection, table_name: s
         if cursor:
             cursor.close()
 
-def query_table(connection: psycopg2.extensions.connection, table_name: str, last_sent_id: int = 0) -> dict:
+def query_schema_version(connection: psycopg2.extensions.connection, table_name: str) -> Optional[str]:
+    """
+    Read a cheap version stamp of a table's definition: its oid and the xmin of its pg_class row,
+    which changes whenever DDL such as ALTER TABLE rewrites that row.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table.
+    
+    Returns:
+    - str: The version stamp, or None if it could not be read.
+    """
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        # regclass parses the name like an identifier in a query, so pass it quoted the same way
+        cursor.execute("SELECT oid, xmin FROM pg_class WHERE oid = %s::regclass;", (identifier(table_name).as_string(cursor),))
+        oid, xmin = cursor.fetchone()
+        return f"{oid}:{xmin}"
+    except Error as e:
+        logger.error(f"Error querying schema version for table {table_name}: {e}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+
+def cached_table_schema(connection: psycopg2.extensions.connection, table_name: str) -> list:
+    """
+    Return the schema of a table from the in-process and on-disk cache, querying information_schema
+    only when the table is not cached yet or its definition changed since it was cached.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table.
+    
+    Returns:
+    - list: A list of dictionaries defining column names and types.
+    """
+    global _SCHEMA_CACHE
+    version = query_schema_version(connection, table_name)
+    with _SCHEMA_CACHE_LOCK:
+        if _SCHEMA_CACHE is None:
+            _SCHEMA_CACHE = {}
+            try:
+                if os.path.exists(SCHEMA_CACHE_FILE):
+                    with open(SCHEMA_CACHE_FILE, 'rb') as f:
+                        _SCHEMA_CACHE = pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading schema cache: {e}")
+        cached = _SCHEMA_CACHE.get(table_name)
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    
+    schema = query_table_schema(connection, table_name)
+    if schema and version is not None:
+        with _SCHEMA_CACHE_LOCK:
+            _SCHEMA_CACHE[table_name] = (version, schema)
+            try:
+                with open(SCHEMA_CACHE_FILE, 'wb') as f:
+                    pickle.dump(_SCHEMA_CACHE, f)
+            except Exception as e:
+                logger.error(f"Error saving schema cache: {e}")
+    return schema
+
+def identifier(name: str) -> sql.Identifier:
+    """Quote a table name, which may be schema-qualified (e.g. "public.events"), as an SQL identifier."""
+    return sql.Identifier(*name.split("."))
+
+@lru_cache(maxsize=128)
+def batch_sql(table_name: str, since_last_id: bool, sharded: bool, bounded: bool = False) -> sql.Composed:
+    """Build (once per table and combination of filters) the keyset query reading one batch of rows in query_table."""
+    conditions = ["id > %s"] if since_last_id else []
+    if bounded:
+        conditions.append("id <= %s")
+    if sharded:
+        # PostgreSQL's % keeps the sign of the dividend; normalise so negative ids land in shards 0..N-1 too
+        conditions.append("((id % %s) + %s) % %s = %s")
+    # The initial sync has no lower bound, so rows with id <= 0 are included as well
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return sql.SQL("SELECT * FROM {}" + where + " ORDER BY id LIMIT %s").format(identifier(table_name))
+
+def execute_prepared(cursor: psycopg2.extensions.cursor, query, params: list) -> None:
+    """
+    Execute a query through a server-side prepared statement, creating it on first use per connection.
+    The server then parses and plans the query once per session instead of for every batch and sync.
+    A statement the session already holds (e.g. behind a session-pooling proxy) is reused as is.
+    A statement whose table gained or lost columns is rejected by PostgreSQL with "cached plan must
+    not change result type"; it is then deallocated and prepared again after rolling back the read
+    transaction, which holds no changes on the source connection. Keep in sync with db_sync.execute_prepared.
+    
+    Parameters:
+    - cursor: The cursor to execute the statement with.
+    - query: The query (str or psycopg2.sql Composable) using %s placeholders, without a trailing semicolon.
+    - params (list): The query parameters.
+    """
+    if isinstance(query, sql.Composable):
+        query = query.as_string(cursor)
+    name = "sync_" + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    prepared = _PREPARED_STATEMENTS.setdefault(cursor.connection, set())
+    if name not in prepared:
+        # The session may already hold the statement, e.g. when reused through a session-pooling proxy
+        cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s;", (name,))
+        if cursor.fetchone() is None:
+            prepare_statement(cursor, name, query)
+        prepared.add(name)
+    try:
+        execute_statement(cursor, name, params)
+    except Error as e:
+        if e.pgcode != errorcodes.FEATURE_NOT_SUPPORTED:
+            raise
+        logger.info(f"Preparing statement {name} again after a change to the queried table: {e}")
+        cursor.connection.rollback()
+        cursor.execute(f"DEALLOCATE {name};")
+        prepare_statement(cursor, name, query)
+        execute_statement(cursor, name, params)
+
+def prepare_statement(cursor: psycopg2.extensions.cursor, name: str, query: str) -> None:
+    """Create a server-side prepared statement from a query with %s placeholders, numbering them $1, $2, ..."""
+    parts = query.split("%s")
+    numbered = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+    cursor.execute(f"PREPARE {name} AS {numbered};")
+
+def execute_statement(cursor: psycopg2.extensions.cursor, name: str, params: list) -> None:
+    """Execute a server-side prepared statement with the given parameters."""
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))});", params)
+    else:
+        cursor.execute(f"EXECUTE {name};")
+
+def query_max_id(connection: psycopg2.extensions.connection, table_name: str) -> Optional[int]:
     """
-    Query information and schema from a specified table in the PostgreSQL database.
-    Only retrieves rows with id greater than last_sent_id if provided.
+    Query the highest id currently in a table, used as the common upper bound of the shards of a sync.
     
     Parameters:
     - connection: A connection object to the PostgreSQL database.
     - table_name (str): The name of the table to query.
-    - last_sent_id (int): The ID of the last sent row to filter new data.
     
     Returns:
-    - dict: A dictionary containing the schema, data rows, and the new last sent ID from the table.
+    - int: The highest id, or None if the table is empty.
+    
+    Raises:
+    - psycopg2.Error: If the query fails.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql.SQL("SELECT max(id) FROM {}").format(identifier(table_name)))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        connection.rollback()
+
+def query_table(connection: psycopg2.extensions.connection, table_name: str, last_sent_id: int = 0, batch_size: int = 10000, shard_id: int = 0, shard_count: int = 1, max_id: Optional[int] = None) -> Iterator[list]:
+    """
+    Stream rows from a specified table in the PostgreSQL database in batches of batch_size rows,
+    so memory use stays bounded regardless of the table size. Only retrieves rows with id greater
+    than last_sent_id if provided. Each batch is read with a prepared keyset query
+    (id > the last id of the previous batch ... ORDER BY id LIMIT batch_size), so the query is planned
+    once per connection rather than on every sync, and each batch starts with an index lookup.
+    With shard_count > 1 only rows where id % shard_count == shard_id are returned (taking the
+    non-negative remainder, so negative ids are sharded as well). With max_id only rows with id <= max_id are returned.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table to query.
+    - last_sent_id (int): The ID of the last sent row to filter new data.
+    - batch_size (int): The number of rows fetched from the server and yielded at a time.
+    - shard_id (int): The shard of the table to return, from 0 to shard_count - 1.
+    - shard_count (int): The number of shards the table is split into.
+    - max_id (int): The highest id to return, or None for no upper bound.
+    
+    Yields:
+    - list: Lists of up to batch_size row tuples, ordered by id.
+    
+    Raises:
+    - psycopg2.Error: If a batch cannot be read; the batches yielded before were complete.
     """
     cursor = None
+    total_rows = 0
+    shard_params = [shard_count, shard_count, shard_count, shard_id] if shard_count > 1 else []
     try:
         cursor = connection.cursor()
-        # Query data
-        if last_sent_id > 0:
-            query = f"SELECT * FROM {table_name} WHERE id > %s ORDER BY id;"
-            cursor.execute(query, (last_sent_id,))
-        else:
-            query = f"SELECT * FROM {table_name} ORDER BY id;"
-            cursor.execute(query)
-        rows = cursor.fetchall()
-        new_last_sent_id = last_sent_id
-        if rows:
-            logger.info(f"Successfully retrieved {len(rows)} new rows from table {table_name}.")
-            # Update last sent ID based on the last row
-            new_last_sent_id = rows[-1][0] if rows[-1][0] is not None else last_sent_id
+        last_id = last_sent_id if last_sent_id > 0 else None
+        while True:
+            query = batch_sql(table_name, last_id is not None, shard_count > 1, max_id is not None)
+            params = ([] if last_id is None else [last_id]) + ([] if max_id is None else [max_id]) + shard_params + [batch_size]
+            execute_prepared(cursor, query, params)
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            total_rows += len(rows)
+            yield rows
+            last_id = rows[-1][0]
+            if len(rows) < batch_size or last_id is None:
+                break
+        if total_rows:
+            logger.info(f"Successfully retrieved {total_rows} new rows from table {table_name}.")
         else:
             logger.info(f"No new rows found in table {table_name} since last sync.")
-        # Query schema only if it's the initial sync
-        schema = query_table_schema(connection, table_name) if last_sent_id == 0 else []
-        return {'schema': schema, 'data': rows, 'new_last_sent_id': new_last_sent_id}
     except Error as e:
         logger.error(f"Error querying table {table_name}: {e}")
-        return {'schema': [], 'data': [], 'new_last_sent_id': last_sent_id}
+        # Raise to the consumer so a partially read table is not reported as fully sent
+        raise
     finally:
         if cursor:
             cursor.close()
+        # End the read transaction so no snapshot is held between syncs (prepared statements outlive it)
+        if not connection.closed:
+            connection.rollback()
 
-def send_data_over_socket(client_socket: socket.socket, payload: dict) -> bool:
+def encode_payload(payload: dict) -> bytes:
+    """
+    Serialize a payload to UTF-8 encoded JSON, using orjson when it is available.
+    Values without a native JSON representation (e.g. Decimal) are converted with str().
+    
+    Parameters:
+    - payload (dict): The payload to serialize.
+    
+    Returns:
+    - bytes: The encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, default=str).encode('utf-8')
+
+def zstd_compressor() -> "zstandard.ZstdCompressor":
+    """Return this thread's zstd compressor, created on first use and reused for every later frame."""
+    compressor = getattr(_ZSTD_STATE, "compressor", None)
+    if compressor is None:
+        compressor = _ZSTD_STATE.compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+    return compressor
+
+def encode_frame(payload: dict) -> tuple[bytes, bytes]:
+    """
+    Encode a payload as a complete wire message: a flags byte and an 8-byte big-endian length header
+    followed by the JSON (or MessagePack) body, which is zstd-compressed when compression is enabled.
+    Header and body are kept apart, so a large body is never copied again just to prepend the header.
+    
+    Parameters:
+    - payload (dict): The payload to encode.
+    
+    Returns:
+    - tuple: (header, body) of the framed message, ready to be written to the socket with send_frame.
+    """
+    flags = 0
+    if MSGPACK_ENCODER is not None:
+        encoded_message = MSGPACK_ENCODER.encode(payload)
+        flags |= FLAG_MSGPACK
+    else:
+        encoded_message = encode_payload(payload)
+    if USE_ZSTD:
+        encoded_message = zstd_compressor().compress(encoded_message)
+        flags |= FLAG_ZSTD
+    return FRAME_HEADER.pack(flags, len(encoded_message)), encoded_message
+
+def send_frame(client_socket: socket.socket, frame: tuple[bytes, bytes]) -> bool:
     """
-    Send data over the socket connection as a JSON string.
-    Ensures all data is sent even if it exceeds buffer size.
+    Send an already framed message over the socket connection.
     
     Parameters:
     - client_socket: The socket object for the client connection.
-    - payload: The payload containing schema and data to send (should be serializable to JSON).
+    - frame (tuple): The (header, body) message produced by encode_frame.
     
     Returns:
-    - bool: True if the data was sent successfully, False otherwise.
+    - bool: True if the frame was sent successfully, False otherwise.
     """
+    header, body = frame
+    large = len(body) > TLS_RECORD_BYTES
+    # TLS writes a frame as a series of 16 KiB records. With TCP_NODELAY each record would end in a short segment,
+    # so on Linux the socket is corked while a frame is written and uncorked to flush its tail immediately
+    cork = hasattr(socket, "TCP_CORK") and large
     try:
-        # Prepare payload without new_last_sent_id
-        send_payload = {'schema': payload['schema'], 'data': payload['data']}
-        message = json.dumps(send_payload)
-        encoded_message = message.encode('utf-8')
-        total_sent = 0
-        while total_sent < len(encoded_message):
-            sent = client_socket.send(encoded_message[total_sent:])
-            if sent == 0:
-                raise RuntimeError("Socket connection broken")
-            total_sent += sent
-        logger.info(f"Sent data over socket: {message[:100]}... (total {len(message)} characters)")
+        if cork:
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        if large:
+            # TLS sockets do not support sendmsg; sending the header on its own avoids copying the body
+            client_socket.sendall(header)
+            client_socket.sendall(body)
+        else:
+            client_socket.sendall(header + body)
+        logger.debug("Sent data over socket: %s... (total %d bytes)", body[:100], len(header) + len(body))
         return True
     except Exception as e:
         logger.error(f"Error sending data over socket: {e}")
         return False
+    finally:
+        if cork:
+            try:
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+            except OSError:
+                pass
 
-# Example usage
-if __name__ == "__main__":
-    import time
-    import pickle
+def send_data_over_socket(client_socket: socket.socket, payload: dict) -> bool:
+    """
+    Send data over the socket connection as a JSON document prefixed with a flags byte and its length.
+    The 8-byte big-endian length header lets the server read exactly one message without guessing where it ends.
     
-    # File to store the last sent ID for persistence
-    LAST_SENT_ID_FILE = "last_sent_id.pkl"
+    Parameters:
+    - client_socket: The socket object for the client connection.
+    - payload: The payload containing schema and a batch of data rows to send (should be serializable to JSON).
     
-def load_last_sent_id():
+    Returns:
+    - bool: True if the data was sent successfully, False otherwise.
+    """
+    try:
+        frame = encode_frame(payload)
+    except Exception as e:
+        logger.error(f"Error encoding data for socket: {e}")
+        return False
+    return send_frame(client_socket, frame)
+
+def load_last_sent_id() -> int:
     """Load the last sent ID from a file if it exists, initialize a new file if it doesn't."""
     try:
         if os.path.exists(LAST_SENT_ID_FILE):
-            with open(LAST_SENT_ID_FILE, 'rb') as f:
-                return pickle.load(f)
-        else:
-            # Initialize a new pickle file with ID 0 if it doesn't exist
-            with open(LAST_SENT_ID_FILE, 'wb') as f:
-                pickle.dump(0, f)
-            logger.info(f"Initialized new last sent ID file: {LAST_SENT_ID_FILE}")
-            return 0
+            with open(LAST_SENT_ID_FILE) as f:
+                return int(f.read())
+        last_sent_id = 0
+        if os.path.exists(LEGACY_LAST_SENT_ID_FILE):
+            # Carry over the ID saved by earlier versions
+            with open(LEGACY_LAST_SENT_ID_FILE, 'rb') as f:
+                last_sent_id = pickle.load(f)
+        # Initialize a new file if it doesn't exist
+        save_last_sent_id(last_sent_id)
+        logger.info(f"Initialized new last sent ID file: {LAST_SENT_ID_FILE}")
+        return last_sent_id
     except Exception as e:
         logger.error(f"Error loading last sent ID: {e}")
         return 0
+
+def save_last_sent_id(last_sent_id: int) -> None:
+    """Save the last sent ID to a file for persistence, replacing it atomically so a crash never leaves it half written."""
+    try:
+        temp_file = LAST_SENT_ID_FILE + ".tmp"
+        with open(temp_file, 'w') as f:
+            f.write(str(last_sent_id))
+        os.replace(temp_file, LAST_SENT_ID_FILE)
+    except Exception as e:
+        logger.error(f"Error saving last sent ID: {e}")
+
+def encode_id_deltas(rows: list) -> Optional[list]:
+    """
+    Replace the id in the first column of each row with its difference to the previous row's id;
+    the first row keeps its full id. The server restores the ids with decode_id_deltas.
+    
+    Parameters:
+    - rows (list): A batch of rows ordered by id, as returned by query_table.
+    
+    Returns:
+    - list: The delta-encoded rows, or None if an id is not an integer.
+    """
+    encoded = []
+    previous = 0
+    for row in rows:
+        row_id = row[0]
+        if not isinstance(row_id, int):
+            return None
+        encoded.append((row_id - previous, *row[1:]))
+        previous = row_id
+    return encoded
+
+def encode_data_frame(rows: list) -> tuple[bytes, bytes]:
+    """Return the framed data-only message for a batch of rows, with id deltas if ID_DELTAS is enabled."""
+    if ID_DELTAS:
+        encoded = encode_id_deltas(rows)
+        if encoded is not None:
+            return encode_frame({'data': encoded, 'id_deltas': True})
+    return encode_frame({'data': rows})
+
+def encode_schema_frame(db_connection: psycopg2.extensions.connection, table_name: str) -> tuple[bytes, bytes]:
+    """
+    Return the framed schema-only message for a table, encoding it only when the cached schema changed.
+    
+    Parameters:
+    - db_connection: A connection object to the source PostgreSQL database.
+    - table_name (str): The name of the table being synced.
+    
+    Returns:
+    - tuple: The (header, body) framed message carrying the table schema.
+    """
+    schema = cached_table_schema(db_connection, table_name)
+    with _SCHEMA_CACHE_LOCK:
+        cached = _SCHEMA_FRAMES.get(table_name)
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+    frame = encode_frame({'schema': schema})
+    with _SCHEMA_CACHE_LOCK:
+        _SCHEMA_FRAMES[table_name] = (schema, frame)
+    return frame
+
+def encode_batches(db_connection: psycopg2.extensions.connection, table_name: str, batches: Iterable[list], send_empty: bool = False) -> Iterator[tuple[list, tuple[bytes, bytes]]]:
+    """
+    Turn batches of rows into framed messages. The (cached) table schema goes out once, in a schema-only
+    message ahead of the first batch, and the batches themselves only carry rows.
+    
+    Parameters:
+    - db_connection: A connection object to the source PostgreSQL database.
+    - table_name (str): The name of the table being synced.
+    - batches: The row batches, e.g. from query_table.
+    - send_empty (bool): Produce the schema message even if there are no rows (used on the initial sync).
+    
+    Yields:
+    - tuple: (the batch of rows, empty for the schema message, and the framed message).
+    """
+    schema_sent = False
+    try:
+        for rows in batches:
+            if not schema_sent:
+                yield [], encode_schema_frame(db_connection, table_name)
+                schema_sent = True
+            yield rows, encode_data_frame(rows)
+        if not schema_sent and send_empty:
+            yield [], encode_schema_frame(db_connection, table_name)
+    finally:
+        if hasattr(batches, "close"):
+            batches.close()
+
+def prefetch(iterable: Iterable, depth: int = 1) -> Iterator:
+    """
+    Iterate over an iterable in a background thread, keeping up to depth items ready ahead of the consumer.
+    psycopg2 releases the GIL while waiting on the database, so the next batch is fetched while the
+    current one is being serialized and sent. Exceptions raised by the iterable are re-raised to the consumer.
+    
+    Parameters:
+    - iterable: The source of items, e.g. the batch generator returned by query_table.
+    - depth (int): The maximum number of items buffered ahead of the consumer.
+    
+    Yields:
+    - The items of iterable, in order.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
     
-    def save_last_sent_id(last_sent_id):
-        """Save the last sent ID to a file for persistence."""
+    def put(entry) -> bool:
+        # Wait for room in the queue, giving up if the consumer has stopped
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
         try:
-            with open(LAST_SENT_ID_FILE, 'wb') as f:
-                pickle.dump(last_sent_id, f)
+            for item in iterable:
+                if not put((True, item)):
+                    return
         except Exception as e:
-            logger.error(f"Error saving last sent ID: {e}")
+            put((False, e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+            put(None)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            entry = items.get()
+            if entry is None:
+                return
+            ok, value = entry
+            if not ok:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        producer.join()
+
+def connection_alive(client_socket: ssl.SSLSocket) -> bool:
+    """
+    Check without blocking whether the server is still connected. The server never sends application data,
+    so a readable socket either carries TLS housekeeping (e.g. TLS 1.3 session tickets, processed here)
+    or signals that the server closed the connection.
+    
+    Parameters:
+    - client_socket: The TLS socket connected to the server.
+    
+    Returns:
+    - bool: True if the connection can still be used, False otherwise.
+    """
+    try:
+        readable, _, _ = select.select([client_socket], [], [], 0)
+        if not readable:
+            return True
+        client_socket.setblocking(False)
+        try:
+            return client_socket.recv(1) != b""
+        finally:
+            client_socket.setblocking(True)
+    except ssl.SSLWantReadError:
+        return True
+    except OSError:
+        return False
+
+def ensure_connection() -> Optional[ssl.SSLSocket]:
+    """
+    Return the connection to the target server kept open between syncs, reconnecting if it was closed.
+    
+    Returns:
+    - client_socket: The connected socket, or None if the server could not be reached.
+    """
+    global _SERVER_SOCKET
+    if _SERVER_SOCKET is not None and not connection_alive(_SERVER_SOCKET):
+        logger.info("Connection to the target server was closed; reconnecting.")
+        drop_connection()
+    if _SERVER_SOCKET is None:
+        _SERVER_SOCKET = connect_to_tcp_server(host=os.getenv("TARGET_SERVER_HOST", "host_b_ip_address"))
+    return _SERVER_SOCKET
+
+def drop_connection() -> None:
+    """Close the persistent connection without the end of sync marker, e.g. after a send error."""
+    global _SERVER_SOCKET, _TLS_SESSION
+    if _SERVER_SOCKET is not None:
+        _TLS_SESSION = _SERVER_SOCKET.session or _TLS_SESSION
+        _SERVER_SOCKET.close()
+        _SERVER_SOCKET = None
+        logger.info("Socket connection closed.")
+
+def close_connection() -> None:
+    """Send the end of sync marker over the persistent connection and close it."""
+    if _SERVER_SOCKET is not None and not send_frame(_SERVER_SOCKET, EOF_FRAME):
+        logger.warning("Failed to send end of sync marker.")
+    drop_connection()
+
+def send_batches(db_connection: psycopg2.extensions.connection, table_name: str, last_sent_id: int, batch_size: int = 10000, shard_id: int = 0, shard_count: int = 1, persistent: bool = False, max_id: Optional[int] = None) -> tuple[int, bool]:
+    """
+    Send rows newer than last_sent_id to the target server, one framed message per batch.
+    A background thread fetches and encodes up to PIPELINE_DEPTH batches ahead while the current one is sent.
+    On the initial sync (last_sent_id == 0) the schema is sent even if the table is empty.
+    When the table is not sharded, the last sent ID is persisted after every batch so an interrupted sync
+    resumes where it stopped; sharded syncs leave that to sync_table_sharded.
+    
+    Parameters:
+    - db_connection: A connection object to the source PostgreSQL database.
+    - table_name (str): The name of the table to sync.
+    - last_sent_id (int): The ID of the last row already sent.
+    - batch_size (int): The maximum number of rows per message.
+    - shard_id (int): The shard of the table to send, from 0 to shard_count - 1.
+    - shard_count (int): The number of shards the table is split into.
+    - persistent (bool): Send over the connection kept open between syncs (see ensure_connection) instead of
+      a new connection that is closed with the end of sync marker afterwards.
+    - max_id (int): The highest id to send, or None for no upper bound (see sync_table_sharded).
+    
+    Returns:
+    - tuple: (the ID of the last row sent successfully, True if every new row was sent).
+    """
+    global _TLS_SESSION
+    batches = query_table(db_connection, table_name, last_sent_id, batch_size, shard_id, shard_count, max_id)
+    send_empty = last_sent_id == 0 and shard_id == 0
+    frames = prefetch(encode_batches(db_connection, table_name, batches, send_empty=send_empty), PIPELINE_DEPTH)
+    client = None
+    try:
+        for rows, frame in frames:
+            if client is None:
+                # Connect to the TCP server on Host B once there is something to send
+                client = ensure_connection() if persistent else connect_to_tcp_server(host=os.getenv("TARGET_SERVER_HOST", "host_b_ip_address"))
+                if not client:
+                    return last_sent_id, False
+            if not send_frame(client, frame):
+                logger.warning("Failed to send data.")
+                if persistent:
+                    drop_connection()
+                    client = None
+                return last_sent_id, False
+            if rows:
+                logger.info(f"New data sent successfully. Rows: {len(rows)}")
+            # Update last sent ID if there was new data
+            if rows and rows[-1][0] is not None:
+                last_sent_id = rows[-1][0]
+                if shard_count == 1:
+                    save_last_sent_id(last_sent_id)
+                    logger.info(f"Updated last sent ID to: {last_sent_id}")
+        if client is None:
+            logger.info("No new data to sync.")
+        elif not persistent and not send_frame(client, EOF_FRAME):
+            logger.warning("Failed to send end of sync marker.")
+        return last_sent_id, True
+    except Error:
+        # query_table has logged the error; report the rows sent so far as an unfinished sync
+        return last_sent_id, False
+    finally:
+        frames.close()
+        if client and not persistent:
+            _TLS_SESSION = client.session or _TLS_SESSION
+            client.close()
+            logger.info("Socket connection closed.")
+
+def sync_table(db_connection: psycopg2.extensions.connection, table_name: str, last_sent_id: int, batch_size: int = 10000) -> int:
+    """
+    Send rows newer than last_sent_id to the target server, one framed message per batch,
+    over the connection kept open between syncs.
+    
+    Parameters:
+    - db_connection: A connection object to the source PostgreSQL database.
+    - table_name (str): The name of the table to sync.
+    - last_sent_id (int): The ID of the last row already sent.
+    - batch_size (int): The maximum number of rows per message.
+    
+    Returns:
+    - int: The ID of the last row sent successfully.
+    """
+    last_sent_id, _ = send_batches(db_connection, table_name, last_sent_id, batch_size, persistent=True)
+    return last_sent_id
+
+def sync_shard(table_name: str, last_sent_id: int, batch_size: int, shard_id: int, shard_count: int, max_id: Optional[int] = None) -> tuple[int, bool]:
+    """
+    Send one shard of the new rows over its own database and server connections.
+    Each shard needs a separate database connection because it runs its own keyset queries, with their
+    prepared statements and read transaction, concurrently with the other shards; a connection runs one query at a time.
+    
+    Parameters:
+    - table_name (str): The name of the table to sync.
+    - last_sent_id (int): The ID of the last row already sent.
+    - batch_size (int): The maximum number of rows per message.
+    - shard_id (int): The shard of the table to send, from 0 to shard_count - 1.
+    - shard_count (int): The number of shards the table is split into.
+    - max_id (int): The highest id to send, shared by all shards of the sync.
+    
+    Returns:
+    - tuple: (the ID of the last row of this shard sent successfully, True if the whole shard was sent).
+    """
+    db_connection = connect_to_postgres(host=os.getenv("SOURCE_DB_HOST", "host_a_ip_address"))
+    if not db_connection:
+        return last_sent_id, False
+    try:
+        return send_batches(db_connection, table_name, last_sent_id, batch_size, shard_id, shard_count, max_id=max_id)
+    finally:
+        db_connection.close()
+
+def sync_table_sharded(db_connection: psycopg2.extensions.connection, table_name: str, last_sent_id: int, batch_size: int = 10000, shard_count: int = 1) -> int:
+    """
+    Send rows newer than last_sent_id to the target server over shard_count parallel connections,
+    splitting the table by id % shard_count. The server spreads the connections over its receiver workers.
+    All shards stop at the highest id present when the sync starts, so rows inserted meanwhile are left
+    for the next sync instead of being sent by some shards only.
+    The last sent ID is persisted once all shards finish: that upper bound if every shard completed,
+    otherwise the lowest ID reached by an unfinished shard, so no row is skipped on the next sync.
+    
+    Parameters:
+    - db_connection: A connection object to the source PostgreSQL database, used to read the upper bound.
+    - table_name (str): The name of the table to sync.
+    - last_sent_id (int): The ID of the last row already sent.
+    - batch_size (int): The maximum number of rows per message.
+    - shard_count (int): The number of parallel shards.
+    
+    Returns:
+    - int: The ID up to which every row has been sent.
+    """
+    try:
+        max_id = query_max_id(db_connection, table_name)
+    except Error as e:
+        logger.error(f"Error querying the highest id of table {table_name}: {e}")
+        return last_sent_id
+    if max_id is None or max_id <= last_sent_id:
+        # Nothing new is bounded by max_id; still run the shards on the initial sync so the schema is sent
+        max_id = last_sent_id
+        if last_sent_id != 0:
+            logger.info("No new data to sync.")
+            return last_sent_id
+    with ThreadPoolExecutor(max_workers=shard_count) as executor:
+        futures = [executor.submit(sync_shard, table_name, last_sent_id, batch_size, shard_id, shard_count, max_id) for shard_id in range(shard_count)]
+        results = [future.result() for future in futures]
+    unfinished = [shard_last_id for shard_last_id, complete in results if not complete]
+    if unfinished:
+        logger.warning(f"{len(unfinished)} of {shard_count} shards did not finish; they will be resumed on the next sync.")
+        new_last_sent_id = min(unfinished)
+    else:
+        new_last_sent_id = max_id
+    if new_last_sent_id != last_sent_id:
+        save_last_sent_id(new_last_sent_id)
+        logger.info(f"Updated last sent ID to: {new_last_sent_id}")
+    return new_last_sent_id
+
+def start_listening(table_name: str, channel: str) -> Optional[psycopg2.extensions.connection]:
+    """
+    Open a dedicated autocommit connection to the source database that is notified of new rows in a table.
+    Installs (or replaces) a statement-level AFTER INSERT trigger sending NOTIFY on the channel, then LISTENs on it.
+    
+    Parameters:
+    - table_name (str): The name of the table to watch.
+    - channel (str): The notification channel.
+    
+    Returns:
+    - connection: The listening connection, or None if it could not be set up.
+    """
+    connection = connect_to_postgres(host=os.getenv("SOURCE_DB_HOST", "host_a_ip_address"))
+    if not connection:
+        return None
+    cursor = None
+    try:
+        connection.autocommit = True
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                CREATE OR REPLACE FUNCTION db_sync_notify() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify(TG_ARGV[0], '');
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+            cursor.execute(sql.SQL("DROP TRIGGER IF EXISTS db_sync_client_notify ON {};").format(identifier(table_name)))
+            cursor.execute(sql.SQL(
+                "CREATE TRIGGER db_sync_client_notify AFTER INSERT ON {} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION db_sync_notify(%s);"
+            ).format(identifier(table_name)), (channel,))
+        except Error as e:
+            # Without the trigger no notification arrives and the client falls back to syncing every interval
+            logger.warning(f"Could not install notify trigger on table {table_name}: {e}")
+        cursor.execute(sql.SQL("LISTEN {};").format(sql.Identifier(channel)))
+        logger.info(f"Listening for new rows in table {table_name} on channel {channel}.")
+        return connection
+    except Error as e:
+        logger.error(f"Error listening on channel {channel}: {e}")
+        connection.close()
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+
+def wait_for_changes(connection: psycopg2.extensions.connection, timeout: float) -> bool:
+    """
+    Block until a notification arrives on a listening connection or the timeout expires,
+    then drain all pending notifications so a burst of inserts triggers a single sync.
+    
+    Parameters:
+    - connection: The connection returned by start_listening.
+    - timeout (float): The maximum number of seconds to wait.
+    
+    Returns:
+    - bool: False if the connection failed and has to be set up again, True otherwise.
+    """
+    try:
+        if select.select([connection], [], [], timeout) != ([], [], []):
+            connection.poll()
+            logger.debug("Woken by %d notifications.", len(connection.notifies))
+            connection.notifies.clear()
+        return True
+    except (Error, OSError) as e:
+        logger.error(f"Error waiting for notifications: {e}")
+        return False
+
+# Example usage
+if __name__ == "__main__":
+    import time
     
     # Load the last sent ID from previous execution
     last_sent_id = load_last_sent_id()
@@ -227,35 +1016,27 @@ def load_last_sent_id():
         try:
             table_name = os.getenv("TABLE_NAME", "your_table_name")
             sync_interval = int(os.getenv("SYNC_INTERVAL_SECONDS", 60))  # Default to 60 seconds
+            batch_size = int(os.getenv("BATCH_SIZE", 10000))  # Default to 10000 rows per message
+            shard_count = int(os.getenv("SYNC_SHARDS", 1))  # Default to a single connection
+            notify_channel = os.getenv("NOTIFY_CHANNEL")  # Default to polling every sync interval
+            listen_conn = None
             
             while True:
                 try:
-                    # Query new data and schema (schema only on initial sync)
-                    table_payload = query_table(db_conn, table_name, last_sent_id)
-                    if table_payload['data'] or table_payload['schema']:  # Send if there is new data or initial schema
-                        # Connect to the TCP server on Host B
-                        client = connect_to_tcp_server(host=os.getenv("TARGET_SERVER_HOST", "host_b_ip_address"))
-                        if client:
-                            try:
-                                if send_data_over_socket(client, table_payload):
-                                    logger.info(f"New data sent successfully. Rows: {len(table_payload['data'])}")
-                                    # Update last sent ID if there was new data
-                                    if table_payload['data']:
-                                        last_sent_id = table_payload['new_last_sent_id']
-                                        save_last_sent_id(last_sent_id)
-                                        logger.info(f"Updated last sent ID to: {last_sent_id}")
-                                else:
-                                    logger.warning("Failed to send data.")
-                                client.close()
-                                logger.info("Socket connection closed.")
-                            except Exception as e:
-                                logger.error(f"Client error: {e}")
-                                client.close()
+                    # Stream new data (and the schema) to the target server in batches
+                    if shard_count > 1:
+                        last_sent_id = sync_table_sharded(db_conn, table_name, last_sent_id, batch_size, shard_count)
                     else:
-                        logger.info("No new data to sync.")
+                        last_sent_id = sync_table(db_conn, table_name, last_sent_id, batch_size)
                     
-                    # Wait before the next sync
-                    time.sleep(sync_interval)
+                    # Wait before the next sync, waking early when new rows are announced
+                    if notify_channel and listen_conn is None:
+                        listen_conn = start_listening(table_name, notify_channel)
+                    if listen_conn is None:
+                        time.sleep(sync_interval)
+                    elif not wait_for_changes(listen_conn, sync_interval):
+                        listen_conn.close()
+                        listen_conn = None
                 except KeyboardInterrupt:
                     logger.info("Stopping continuous sync...")
                     break
@@ -265,6 +1046,7 @@ def load_last_sent_id():
         except Exception as e:
             logger.error(f"Database operation error: {e}")
         finally:
+            close_connection()
             if db_conn:
                 db_conn.close()
                 logger.info("Database connection closed.")
@@ -1,39 +1,206 @@
 import socket
+import ssl
 import json
+import struct
+import hashlib
+import weakref
 import psycopg2
-from psycopg2 import Error
+from psycopg2 import Error, sql
+from psycopg2.extras import execute_batch, execute_values, Json
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 import os
 import logging
-from typing import Optional
+import logging.handlers
+import atexit
+import threading
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import itertools
+from functools import lru_cache
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Optional, Iterator, Iterable
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library json module if orjson is not installed
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    # Only needed to receive frames from clients running with WIRE_FORMAT=msgpack
+    msgspec = None
+
+try:
+    import zstandard
+except ImportError:
+    # Only needed to receive frames from clients running with COMPRESSION=zstd
+    zstandard = None
+
 # Load environment variables from .env file if it exists
 load_dotenv()
 
 # Configure logging
+# Records are formatted by the calling thread and written to the file and console by a background listener thread,
+# so log I/O never blocks the accept, receive and load paths
+_LOG_QUEUE = queue.SimpleQueue()
+_LOG_LISTENER = logging.handlers.QueueListener(
+    _LOG_QUEUE,
+    logging.FileHandler("db_sync_server.log"),
+    logging.StreamHandler()
+)
 logging.basicConfig(
-    level=logging.INFO,
+    level=(os.getenv("LOG_LEVEL") or "INFO").upper(),
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("db_sync_server.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_LOG_QUEUE)]
 )
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
 logger = logging.getLogger(__name__)
 
-def start_tcp_server(host: str = "localhost", port: int = 443) -> Optional[socket.socket]:
+# Every message is prefixed with a 1-byte flags field and its length as an 8-byte big-endian unsigned integer
+FRAME_HEADER = struct.Struct('>BQ')
+
+# Frame flag: the message body is zstd-compressed
+FLAG_ZSTD = 0x01
+
+# Frame flag: the message body is MessagePack instead of JSON
+FLAG_MSGPACK = 0x02
+
+# Decoder for MessagePack message bodies
+MSGPACK_DECODER = msgspec.msgpack.Decoder() if msgspec is not None else None
+
+# msgspec's JSON decoder, used for JSON bodies when orjson is not installed
+JSON_DECODER = msgspec.json.Decoder() if msgspec is not None else None
+
+# Kernel receive buffer requested for the listening socket (and inherited by accepted connections);
+# it must be set before listen() so TCP can advertise a window scale large enough to use it
+RECEIVE_BUFFER_BYTES = 4 << 20
+
+# Number of decoded messages a client's socket reader may queue ahead of the database loader
+PIPELINE_DEPTH = 4
+
+# Number of pooled database connections per client that load its batches concurrently, so a slow COPY does not stall the socket reader
+LOADER_THREADS = max(1, int(os.getenv("LOADER_THREADS", 1)))
+
+# Rows sent per multi-row INSERT statement, matching the client's batch size so a batch needs a single statement
+INSERT_PAGE_SIZE = int(os.getenv("BATCH_SIZE", 10000))
+
+# Batches with at least this many rows are loaded with COPY; smaller ones with a prepared INSERT (see insert_rows_prepared),
+# which avoids the COPY protocol round trips that dominate for a handful of rows
+COPY_THRESHOLD = int(os.getenv("COPY_THRESHOLD", 500))
+
+# Amount of COPY text handed to the database per read, see CopyLinesReader
+COPY_CHUNK_BYTES = 64 << 10
+
+# Tables apply_schema has already created or found in the target database, so later syncs skip the catalog query
+_KNOWN_TABLES: set[str] = set()
+_KNOWN_TABLES_LOCK = threading.Lock()
+
+# Names of the server-side prepared INSERT statements created on each (pooled) target database connection
+_PREPARED_STATEMENTS: "weakref.WeakKeyDictionary[psycopg2.extensions.connection, set[str]]" = weakref.WeakKeyDictionary()
+_PREPARED_STATEMENTS_LOCK = threading.Lock()
+
+# Bounds of the server's database connection pool, shared by all concurrently handled clients
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 5))
+DB_POOL_MAX = max(1, int(os.getenv("DB_POOL_MAX", 25)))
+
+# Largest frame body accepted, before and after decompression; a corrupt or foreign length header
+# (or zstd content size) is rejected instead of allocating a huge buffer
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", 1 << 30))
+
+# Time a connecting client is given to complete the TLS handshake before its handler gives up on it
+HANDSHAKE_TIMEOUT_SECONDS = 10
+
+# TCP keepalive timing, matching the client: probe after 60s idle, every 15s, give up after 4 missed probes
+KEEPALIVE_IDLE_SECONDS = 60
+KEEPALIVE_INTERVAL_SECONDS = 15
+KEEPALIVE_PROBE_COUNT = 4
+
+# Maximum number of bytes requested per receive call
+BUFFER_SIZE = int(os.getenv("BUFFER_SIZE", 262144))
+
+# Frame bodies up to this size are received into a buffer reused by the reading thread instead of a fresh allocation;
+# larger (rare) frames get their own buffer so one outsized message does not stay allocated for the rest of the session
+SCRATCH_BUFFER_BYTES = 16 << 20
+_RECEIVE_STATE = threading.local()
+
+# Per-thread zstd decompressors, reused across frames; one instance must not be shared by concurrent workers
+_ZSTD_STATE = threading.local()
+
+# Characters that must be backslash-escaped in PostgreSQL COPY text format
+COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# COPY text formatters for the exact types decoded payloads consist of, looked up before format_copy_value's isinstance checks
+COPY_TEXT_FORMATTERS = {
+    type(None): lambda value: "\\N",
+    bool: lambda value: "t" if value else "f",
+    int: str,
+    float: str,
+    str: lambda value: value.translate(COPY_TEXT_ESCAPES),
+}
+
+def configure_client_socket(client_socket: socket.socket) -> None:
+    """
+    Tune a newly accepted client socket. Its receive buffer is inherited from the listening socket,
+    where it has to be set before listen() (see RECEIVE_BUFFER_BYTES).
+    Disables Nagle's algorithm so the server's TLS handshake flights are not held back, starts with
+    quick ACKs where the platform supports it and enables TCP keepalive, with the probe timing of
+    KEEPALIVE_IDLE_SECONDS, to detect vanished clients within minutes instead of hours.
+    
+    Parameters:
+    - client_socket: The accepted socket to configure.
+    """
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if hasattr(socket, "TCP_QUICKACK"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE_SECONDS)
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL_SECONDS)
+    if hasattr(socket, "TCP_KEEPCNT"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_PROBE_COUNT)
+
+@lru_cache(maxsize=None)
+def tls_context(cert_file: str, key_file: str) -> ssl.SSLContext:
+    """
+    Build (once) the server TLS context for the given certificate and key.
+    All listening sockets of the process share it, so session tickets it issues stay valid for later
+    connections and reconnecting clients resume their session instead of performing a full handshake.
+    
+    Parameters:
+    - cert_file (str): Path to the server certificate file.
+    - key_file (str): Path to the server private key file.
+    
+    Returns:
+    - SSLContext: The server TLS context.
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    # Session tickets are on by default; make sure they stay enabled so clients can resume
+    context.options &= ~ssl.OP_NO_TICKET
+    context.load_cert_chain(certfile=cert_file, keyfile=key_file)
+    return context
+
+def start_tcp_server(host: str = "localhost", port: int = 443, reuse_port: bool = False) -> Optional[socket.socket]:
     """
     Create and start a TCP listening socket on the specified host and port with TLS encryption.
     
     Parameters:
     - host (str): The host address to bind the server to. Defaults to env var SERVER_HOST or "localhost".
     - port (int): The port number to listen on. Defaults to env var SERVER_PORT or 443.
+    - reuse_port (bool): Set SO_REUSEPORT so several listening sockets can share the port and the kernel
+      distributes incoming connections between them.
     
     Returns:
     - server_socket: The socket object if successful, None otherwise.
     """
-    import ssl
-    
     host = host if host != "localhost" else os.getenv("SERVER_HOST", "localhost")
     port = port if port != 443 else int(os.getenv("SERVER_PORT", 443))
     try:
@@ -42,6 +209,9 @@ def start_tcp_server(host: str = "localhost", port: int = 443) -> Optional[socke
         
         # Allow port reuse
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
         
         # Bind the socket to the address
         server_socket.bind((host, port))
@@ -50,11 +220,9 @@ def start_tcp_server(host: str = "localhost", port: int = 443) -> Optional[socke
         server_socket.listen(5)
         
         # Wrap the socket with SSL/TLS
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        cert_file = os.getenv("SERVER_CERT_FILE", "server.crt")
-        key_file = os.getenv("SERVER_KEY_FILE", "server.key")
-        context.load_cert_chain(certfile=cert_file, keyfile=key_file)
-        server_socket = context.wrap_socket(server_socket, server_side=True)
+        context = tls_context(os.getenv("SERVER_CERT_FILE", "server.crt"), os.getenv("SERVER_KEY_FILE", "server.key"))
+        # Handshakes are performed by the client handlers (see serve_client), not inside accept()
+        server_socket = context.wrap_socket(server_socket, server_side=True, do_handshake_on_connect=False)
         
         logger.info(f"Secure TLS server started on {host}:{port}, waiting for connections...")
         
@@ -92,32 +260,273 @@ def connect_to_postgres(dbname: str = None, user: str = None, password: str = No
         logger.error(f"Error connecting to PostgreSQL database: {e}")
         return None
 
-def insert_row(connection: psycopg2.extensions.connection, table_name: str, row_data: dict) -> bool:
+def create_connection_pool(minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX, host: str = "localhost") -> Optional[ThreadedConnectionPool]:
     """
-    Insert a row of data into a specified table in the PostgreSQL database.
+    Create a thread-safe pool of connections to the target PostgreSQL database, configured with the
+    same environment variables as connect_to_postgres.
+    
+    Parameters:
+    - minconn (int): The number of connections opened up front and kept open. Defaults to env var DB_POOL_MIN or 5.
+    - maxconn (int): The maximum number of connections. Defaults to env var DB_POOL_MAX or 25.
+    - host (str): The host address of the database server. Defaults to env var TARGET_DB_HOST or "localhost".
+    
+    Returns:
+    - ThreadedConnectionPool: The connection pool, or None if connecting fails.
+    """
+    try:
+        connection_pool = ThreadedConnectionPool(
+            min(minconn, maxconn),
+            maxconn,
+            dbname=os.getenv("TARGET_DB_NAME"),
+            user=os.getenv("TARGET_DB_USER"),
+            password=os.getenv("TARGET_DB_PASSWORD"),
+            host=host if host != "localhost" else os.getenv("TARGET_DB_HOST", "localhost"),
+            port=os.getenv("TARGET_DB_PORT", "5432")
+        )
+        logger.info(f"Successfully created a pool of up to {maxconn} connections to the PostgreSQL database.")
+        return connection_pool
+    except Error as e:
+        logger.error(f"Error connecting to PostgreSQL database: {e}")
+        return None
+
+def identifier(name: str) -> sql.Identifier:
+    """Quote a table name, which may be schema-qualified (e.g. "public.events"), as an SQL identifier."""
+    return sql.Identifier(*name.split("."))
+
+def column_list(columns: tuple) -> sql.Composed:
+    """Quote column names as a comma-separated list of SQL identifiers."""
+    return sql.SQL(', ').join(map(sql.Identifier, columns))
+
+@lru_cache(maxsize=256)
+def insert_sql(table_name: str, columns: tuple) -> sql.Composed:
+    """Build (once per table and column list) the multi-row INSERT statement used by insert_rows."""
+    return sql.SQL("INSERT INTO {} ({}) VALUES %s").format(identifier(table_name), column_list(columns))
+
+@lru_cache(maxsize=256)
+def copy_sql(table_name: str, columns: tuple) -> sql.Composed:
+    """Build (once per table and column list) the COPY ... FROM STDIN statement used by insert_rows_copy."""
+    return sql.SQL("COPY {} ({}) FROM STDIN").format(identifier(table_name), column_list(columns))
+
+@lru_cache(maxsize=64)
+def create_table_sql(table_name: str, schema: tuple) -> sql.Composed:
+    """
+    Build (once per table and schema) the CREATE TABLE IF NOT EXISTS statement used by apply_schema, from (name, type) pairs.
+    Table and column names are quoted as identifiers; the types are the information_schema type names sent by the client.
+    """
+    columns_def = sql.SQL(', ').join(sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(data_type)) for name, data_type in schema)
+    return sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(identifier(table_name), columns_def)
+
+def insert_rows(connection: psycopg2.extensions.connection, table_name: str, columns: list, rows: list, page_size: int = INSERT_PAGE_SIZE) -> bool:
+    """
+    Insert a batch of rows into a specified table in a single transaction.
+    Uses execute_values to send multi-row INSERT statements instead of one round trip and commit per row.
+    JSON objects are passed as json values.
     
     Parameters:
     - connection: A connection object to the PostgreSQL database.
     - table_name (str): The name of the table to insert data into.
-    - row_data (dict): A dictionary where keys are column names and values are the data to insert.
+    - columns (list): The column names, in the order of the values in each row.
+    - rows (list): Lists of values, one per row.
+    - page_size (int): The maximum number of rows sent per INSERT statement. Defaults to env var BATCH_SIZE or 10000.
     
     Returns:
-    - bool: True if the insertion was successful, False otherwise.
+    - bool: True if all rows were inserted successfully, False otherwise.
     """
     cursor = None
     try:
         cursor = connection.cursor()
-        columns = ', '.join(row_data.keys())
-        placeholders = ', '.join(['%s'] * len(row_data))
-        values = tuple(row_data.values())
-        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders});"
-        cursor.execute(query, values)
+        query = insert_sql(table_name, tuple(columns))
+        values = [[Json(value) if isinstance(value, dict) else value for value in row] for row in rows]
+        execute_values(cursor, query, values, page_size=page_size)
         connection.commit()
-        logger.info(f"Successfully inserted row into table {table_name}.")
+        logger.info(f"Successfully inserted {len(rows)} rows into table {table_name}.")
+        return True
+    except Error as e:
+        logger.error(f"Error inserting rows into table {table_name}: {e}")
+        if not connection.closed:
+            connection.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+
+@contextmanager
+def autocommit(connection: psycopg2.extensions.connection) -> Iterator[None]:
+    """
+    Run the enclosed statement as its own implicit transaction. psycopg2 otherwise sends a separate BEGIN
+    before it and needs a COMMIT after it, so a single-statement load costs three round trips instead of one.
+    Must be entered with no transaction in progress.
+    """
+    connection.autocommit = True
+    try:
+        yield
+    finally:
+        if not connection.closed:
+            connection.autocommit = False
+
+def prepare_insert(cursor: psycopg2.extensions.cursor, table_name: str, columns: tuple) -> str:
+    """
+    Return the name of a prepared single-row INSERT into the given columns, creating it on first use per connection.
+    Parameter types are inferred by the database from the target columns.
+    
+    Parameters:
+    - cursor: The cursor to prepare the statement with.
+    - table_name (str): The name of the table to insert data into.
+    - columns (tuple): The column names, in the order of the values in each row.
+    
+    Returns:
+    - str: The name of the prepared statement.
+    """
+    query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+        identifier(table_name),
+        column_list(columns),
+        sql.SQL(', ').join(sql.SQL(f"${i}") for i in range(1, len(columns) + 1))
+    ).as_string(cursor)
+    name = "ins_" + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    with _PREPARED_STATEMENTS_LOCK:
+        prepared = _PREPARED_STATEMENTS.setdefault(cursor.connection, set())
+        if name in prepared:
+            return name
+    cursor.execute(f"PREPARE {name} AS {query};")
+    with _PREPARED_STATEMENTS_LOCK:
+        prepared.add(name)
+    return name
+
+def insert_rows_prepared(connection: psycopg2.extensions.connection, table_name: str, columns: list, rows: list, page_size: int = INSERT_PAGE_SIZE) -> bool:
+    """
+    Insert a batch of rows in a single transaction by executing a prepared INSERT per row, sent to the
+    database page_size executions at a time. The statement is parsed once per pooled connection, which suits
+    the small batches of incremental syncs. JSON objects are passed as json values.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table to insert data into.
+    - columns (list): The column names, in the order of the values in each row.
+    - rows (list): Lists of values, one per row.
+    - page_size (int): The maximum number of executions sent per round trip. Defaults to env var BATCH_SIZE or 10000.
+    
+    Returns:
+    - bool: True if all rows were inserted successfully, False otherwise.
+    """
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        values = [[Json(value) if isinstance(value, dict) else value for value in row] for row in rows]
+        placeholders = ', '.join(['%s'] * len(columns))
+        if len(values) <= page_size:
+            # PREPARE is not transactional, and a single page is one multi-statement query that the database
+            # already runs as one transaction, so neither needs psycopg2's BEGIN and COMMIT
+            with autocommit(connection):
+                name = prepare_insert(cursor, table_name, tuple(columns))
+                execute_batch(cursor, f"EXECUTE {name} ({placeholders})", values, page_size=page_size)
+        else:
+            name = prepare_insert(cursor, table_name, tuple(columns))
+            execute_batch(cursor, f"EXECUTE {name} ({placeholders})", values, page_size=page_size)
+            connection.commit()
+        logger.info(f"Successfully inserted {len(rows)} rows into table {table_name}.")
         return True
     except Error as e:
-        logger.error(f"Error inserting row into table {table_name}: {e}")
-        connection.rollback()
+        logger.error(f"Error inserting rows into table {table_name}: {e}")
+        if not connection.closed:
+            connection.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+
+def format_copy_value(value) -> str:
+    """
+    Format a single decoded JSON or MessagePack value as a field in PostgreSQL COPY text format.
+    
+    Parameters:
+    - value: The value to format.
+    
+    Returns:
+    - str: The escaped field, or \\N for None.
+    
+    Raises:
+    - TypeError: If the value has no unambiguous COPY text representation (e.g. lists or dicts).
+    """
+    formatter = COPY_TEXT_FORMATTERS.get(type(value))
+    if formatter is not None:
+        return formatter(value)
+    # Exact types are handled by COPY_TEXT_FORMATTERS; these checks only serve subclasses and date, time and bytes values
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, str):
+        return value.translate(COPY_TEXT_ESCAPES)
+    raise TypeError(f"Cannot format value of type {type(value).__name__} for COPY")
+
+class CopyLinesReader:
+    """
+    Minimal file-like object handing already formatted COPY lines to cursor.copy_expert a chunk at a time,
+    so the whole batch is never joined into (and copied again by) one large string.
+    """
+    
+    def __init__(self, lines: list):
+        self._lines = iter(lines)
+        # The line being handed out and how much of it has been read already
+        self._current = ""
+        self._offset = 0
+    
+    def read(self, size: int = -1) -> str:
+        parts = []
+        length = 0
+        while size < 0 or length < size:
+            if self._offset == len(self._current):
+                line = next(self._lines, None)
+                if line is None:
+                    break
+                self._current = line + "\n"
+                self._offset = 0
+            end = len(self._current) if size < 0 else min(len(self._current), self._offset + size - length)
+            parts.append(self._current[self._offset:end])
+            length += end - self._offset
+            self._offset = end
+        return "".join(parts)
+
+def insert_rows_copy(connection: psycopg2.extensions.connection, table_name: str, columns: list, rows: list) -> bool:
+    """
+    Load a batch of rows into a specified table with a single COPY ... FROM STDIN run as its own
+    transaction (see autocommit), instead of a round trip and commit per row. Falls back to insert_rows for batches containing
+    values that cannot be formatted for COPY. The formatted lines are streamed to the server in
+    COPY_CHUNK_BYTES pieces rather than joined into one string first.
+    
+    Parameters:
+    - connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table to load data into.
+    - columns (list): The column names, in the order of the values in each row.
+    - rows (list): Lists of values, one per row.
+    
+    Returns:
+    - bool: True if all rows were loaded successfully, False otherwise.
+    """
+    if not rows:
+        return True
+    try:
+        lines = ["\t".join(map(format_copy_value, row)) for row in rows]
+    except TypeError as e:
+        logger.info(f"Falling back to INSERT for table {table_name}: {e}")
+        return insert_rows(connection, table_name, columns, rows)
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        query = copy_sql(table_name, tuple(columns))
+        with autocommit(connection):
+            cursor.copy_expert(query, CopyLinesReader(lines), size=COPY_CHUNK_BYTES)
+        logger.info(f"Successfully loaded {len(rows)} rows into table {table_name}.")
+        return True
+    except Error as e:
+        logger.error(f"Error loading rows into table {table_name}: {e}")
+        if not connection.closed:
+            connection.rollback()
         return False
     finally:
         if cursor:
@@ -126,7 +535,8 @@ def insert_row(connection: psycopg2.extensions.connection, table_name: str, row_
 def apply_schema(connection: psycopg2.extensions.connection, table_name: str, schema: list) -> bool:
     """
     Apply the provided schema to the specified table in the PostgreSQL database.
-    Creates the table if it doesn't exist, or alters it to match the schema.
+    Creates the table with a single CREATE TABLE IF NOT EXISTS if it doesn't exist; existing tables are left unchanged.
+    Tables seen before are remembered, so only the first schema message for a table reaches the database.
     
     Parameters:
     - connection: A connection object to the PostgreSQL database.
@@ -136,140 +546,566 @@ def apply_schema(connection: psycopg2.extensions.connection, table_name: str, sc
     Returns:
     - bool: True if the schema was applied successfully, False otherwise.
     """
+    with _KNOWN_TABLES_LOCK:
+        if table_name in _KNOWN_TABLES:
+            return True
     cursor = None
     try:
         cursor = connection.cursor()
-        # Check if table exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = %s
-            );
-        """, (table_name,))
-        table_exists = cursor.fetchone()[0]
-        
-        if not table_exists:
-            # Create table if it doesn't exist
-            columns_def = ', '.join([f"{col['name']} {col['type']}" for col in schema])
-            create_query = f"CREATE TABLE {table_name} ({columns_def});"
-            cursor.execute(create_query)
-            logger.info(f"Created table {table_name} with schema {schema}.")
-        else:
-            # Check existing columns and alter if necessary (simplified for now)
-            logger.info(f"Table {table_name} already exists. Skipping schema alteration for simplicity.")
-        
-        connection.commit()
+        # Create the table unless it exists, in one statement and round trip
+        with autocommit(connection):
+            cursor.execute(create_table_sql(table_name, tuple((col['name'], col['type']) for col in schema)))
+        logger.info(f"Ensured table {table_name} exists with schema {schema}.")
+        with _KNOWN_TABLES_LOCK:
+            _KNOWN_TABLES.add(table_name)
         return True
     except Error as e:
         logger.error(f"Error applying schema to table {table_name}: {e}")
-        connection.rollback()
+        if connection.closed or (e.pgcode or "").startswith("08"):
+            # The database connection was lost (SQLSTATE class 08); check tables again once reconnected
+            with _KNOWN_TABLES_LOCK:
+                _KNOWN_TABLES.clear()
+        if not connection.closed:
+            connection.rollback()
         return False
     finally:
         if cursor:
             cursor.close()
 
-def handle_client_data(client_socket: socket.socket, client_address: tuple, db_connection: psycopg2.extensions.connection, table_name: str) -> bool:
+def recv_into_exact(client_socket: socket.socket, view: memoryview, buffer_size: int = 262144) -> bool:
+    """
+    Fill a writable buffer completely with data received from a socket, reading with recv_into
+    so the bytes land directly in the target buffer.
+    
+    Parameters:
+    - client_socket: The socket object to read from.
+    - view (memoryview): The buffer to fill.
+    - buffer_size (int): The maximum number of bytes to request per recv_into call.
+    
+    Returns:
+    - bool: True if the buffer was filled, False if the connection closed first.
     """
-    Receive data from a client over the TCP socket and insert it into the database.
-    Handles data larger than buffer size by accumulating chunks until complete.
-    Expects a payload with schema and data.
+    offset = 0
+    length = len(view)
+    while offset < length:
+        received = client_socket.recv_into(view[offset:], min(buffer_size, length - offset))
+        if not received:
+            return False
+        offset += received
+    return True
+
+def scratch_view(length: int) -> memoryview:
+    """
+    Return a writable buffer of the given length to receive a frame body into. Bodies up to
+    SCRATCH_BUFFER_BYTES share one buffer per thread, grown as needed, which is only valid until the next call.
+    
+    Parameters:
+    - length (int): The number of bytes needed.
+    
+    Returns:
+    - memoryview: A view of exactly length bytes.
+    """
+    if length > SCRATCH_BUFFER_BYTES:
+        return memoryview(bytearray(length))
+    scratch = getattr(_RECEIVE_STATE, "scratch", None)
+    if scratch is None or len(scratch) < length:
+        scratch = _RECEIVE_STATE.scratch = bytearray(max(length, BUFFER_SIZE))
+    return memoryview(scratch)[:length]
+
+def zstd_decompressor() -> "zstandard.ZstdDecompressor":
+    """Return this thread's zstd decompressor, created on first use and reused for every later frame."""
+    decompressor = getattr(_ZSTD_STATE, "decompressor", None)
+    if decompressor is None:
+        decompressor = _ZSTD_STATE.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+def decode_payload(data: bytes):
+    """
+    Parse a UTF-8 encoded JSON document, using orjson when it is available, then msgspec, then the json module.
+    orjson and msgspec read bytes, bytearray or memoryview directly, so the message is never copied or decoded to a str first.
+    
+    Parameters:
+    - data (bytes): The encoded JSON document.
+    
+    Returns:
+    - The parsed payload.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if JSON_DECODER is not None:
+        return JSON_DECODER.decode(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+def receive_payload(client_socket: socket.socket, client_address: tuple) -> Optional[object]:
+    """
+    Receive and decode one length-prefixed message from a client over the TCP socket.
+    The header gives the exact message size, so the payload is parsed once after it is fully received;
+    header and body are received into buffers reused by the thread (see scratch_view) and decoded from there. Bodies flagged as zstd-compressed are decompressed first and MessagePack bodies are decoded as such.
     
     Parameters:
     - client_socket: The socket object for the client connection.
     - client_address: The address of the connected client.
+    
+    Returns:
+    - The decoded payload, or None if the client sent the end of sync marker, the connection was closed or an error occurred.
+    """
+    try:
+        header = getattr(_RECEIVE_STATE, "header", None)
+        if header is None:
+            header = _RECEIVE_STATE.header = memoryview(bytearray(FRAME_HEADER.size))
+        if not recv_into_exact(client_socket, header, BUFFER_SIZE):
+            logger.info(f"Client {client_address} disconnected.")
+            return None
+        flags, message_length = FRAME_HEADER.unpack_from(header)
+        if message_length == 0:
+            # A frame with an empty body marks the end of a sync
+            logger.info(f"Client {client_address} finished sending data.")
+            return None
+        if message_length > MAX_FRAME_BYTES:
+            logger.error(f"Client {client_address} announced a {message_length} byte message, more than MAX_FRAME_BYTES ({MAX_FRAME_BYTES}).")
+            return None
+        full_data = scratch_view(message_length)
+        if not recv_into_exact(client_socket, full_data, BUFFER_SIZE):
+            logger.warning(f"Client {client_address} disconnected before sending the full {message_length} byte message.")
+            return None
+        if flags & FLAG_ZSTD:
+            if zstandard is None:
+                logger.error(f"Client {client_address} sent zstd-compressed data but the zstandard package is not installed.")
+                return None
+            # The limit applies to the decompressed body too, so a small frame cannot claim a huge content size
+            content_size = zstandard.frame_content_size(full_data)
+            if content_size > MAX_FRAME_BYTES:
+                logger.error(f"Client {client_address} sent a message decompressing to {content_size} bytes, more than MAX_FRAME_BYTES ({MAX_FRAME_BYTES}).")
+                return None
+            # Frames without a declared content size are decompressed into at most MAX_FRAME_BYTES
+            full_data = zstd_decompressor().decompress(full_data, max_output_size=MAX_FRAME_BYTES)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received complete data from %s: %s... (total %d bytes, %d on the wire)", client_address, bytes(full_data[:100]), len(full_data), message_length)
+        if flags & FLAG_MSGPACK:
+            if MSGPACK_DECODER is None:
+                logger.error(f"Client {client_address} sent MessagePack data but the msgspec package is not installed.")
+                return None
+            return MSGPACK_DECODER.decode(full_data)
+        return decode_payload(full_data)
+    except Exception as e:
+        logger.error(f"Error receiving data from {client_address}: {e}")
+        return None
+
+def decode_id_deltas(rows: list) -> list:
+    """Restore the ids of rows sent with ID_DELTAS, whose first column holds the difference to the previous row's id."""
+    ids = itertools.accumulate(row[0] for row in rows)
+    return [[row_id, *row[1:]] for row_id, row in zip(ids, rows)]
+
+def dict_row_values(rows: list, columns: list) -> list:
+    """
+    Convert rows received as JSON objects to value sequences in column order.
+    The lookups are done in C by operator.itemgetter; if some rows lack a column, all rows are converted
+    with dict.get instead so the missing values become None.
+    
+    Parameters:
+    - rows (list): The rows, as dictionaries keyed by column name.
+    - columns (list): The column names, in the order the values are wanted.
+    
+    Returns:
+    - list: One sequence of values per row.
+    """
+    if not columns:
+        # itemgetter needs at least one key; rows without columns convert to empty value lists as before
+        return [[] for _ in rows]
+    getter = itemgetter(*columns)
+    try:
+        if len(columns) == 1:
+            return [(value,) for value in map(getter, rows)]
+        return list(map(getter, rows))
+    except KeyError:
+        return [list(map(row.get, columns)) for row in rows]
+
+def load_payload(db_connection: psycopg2.extensions.connection, table_name: str, payload, schema: Optional[list] = None) -> bool:
+    """
+    Apply the schema of a received payload and insert its rows into the database.
+    Clients send the schema in a message of its own at the start of each sync, followed by data-only
+    messages whose rows are mapped with that schema; messages carrying both are accepted as well.
+    
+    Parameters:
     - db_connection: A connection object to the PostgreSQL database.
     - table_name (str): The name of the table to insert data into.
+    - payload: The decoded payload, as returned by receive_payload.
+    - schema (list): The schema most recently received on the connection, for data-only payloads.
     
     Returns:
-    - bool: True if data was received and processed, False if the connection was closed or an error occurred.
+    - bool: True if the payload was processed, False if the schema could not be applied, the rows could not be loaded or an error occurred.
     """
     try:
-        buffer_size = int(os.getenv("BUFFER_SIZE", 4096))
-        full_data = b""
-        while True:
-            chunk = client_socket.recv(buffer_size)
-            if not chunk:
-                logger.info(f"Client {client_address} disconnected.")
+        # Check if payload contains a schema and/or data
+        if isinstance(payload, dict) and 'schema' in payload:
+            schema = payload['schema']
+            rows = payload.get('data', [])
+            # Apply schema before inserting data
+            if apply_schema(db_connection, table_name, schema):
+                logger.info(f"Schema applied successfully for table {table_name}.")
+            else:
+                logger.error(f"Failed to apply schema for table {table_name}.")
                 return False
-            full_data += chunk
+        elif isinstance(payload, dict) and 'data' in payload:
+            rows = payload['data']
+        else:
+            # Fallback to old behavior if payload is just a list of rows
+            rows = payload
+        
+        if not rows:
+            return True
+        if isinstance(payload, dict) and payload.get('id_deltas'):
+            rows = decode_id_deltas(rows)
+        # Load the whole batch at once, with columns taken from the rows themselves or the schema
+        if isinstance(rows[0], dict):
+            columns = list(rows[0])
+            values = dict_row_values(rows, columns)
+        elif schema:
+            columns = [col['name'] for col in schema]
+            values = rows
+        else:
+            # Fallback to dummy column names
+            columns = ["column1", "column2"]
+            values = [list(row[:2]) + [None] * (2 - len(row[:2])) for row in rows]
+        if len(values) >= COPY_THRESHOLD:
+            return insert_rows_copy(db_connection, table_name, columns, values)
+        return insert_rows_prepared(db_connection, table_name, columns, values)
+    except Exception as e:
+        logger.error(f"Error loading data into table {table_name}: {e}")
+        return False
+
+def handle_client_data(client_socket: socket.socket, client_address: tuple, db_connection: psycopg2.extensions.connection, table_name: str) -> bool:
+    """
+    Receive one length-prefixed message from a client over the TCP socket and insert it into the database.
+    
+    Parameters:
+    - client_socket: The socket object for the client connection.
+    - client_address: The address of the connected client.
+    - db_connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table to insert data into.
+    
+    Returns:
+    - bool: True if a message was received and processed, False if the client sent the end of sync marker,
+            the connection was closed or an error occurred.
+    """
+    payload = receive_payload(client_socket, client_address)
+    if payload is None:
+        return False
+    return load_payload(db_connection, table_name, payload)
+
+def iter_payloads(client_socket: socket.socket, client_address: tuple) -> Iterator:
+    """Yield the decoded payloads sent by a client until it ends the sync or disconnects."""
+    while True:
+        payload = receive_payload(client_socket, client_address)
+        if payload is None:
+            return
+        yield payload
+
+def prefetch(iterable: Iterable, depth: int = 1) -> Iterator:
+    """
+    Iterate over an iterable in a background thread, keeping up to depth items ready ahead of the consumer.
+    Socket reads and psycopg2 calls release the GIL, so the next message is received and decoded
+    while the current one is being loaded into the database. Exceptions raised by the iterable are re-raised to the consumer.
+    
+    Parameters:
+    - iterable: The source of items, e.g. the payload generator returned by iter_payloads.
+    - depth (int): The maximum number of items buffered ahead of the consumer.
+    
+    Yields:
+    - The items of iterable, in order.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    
+    def put(entry) -> bool:
+        # Wait for room in the queue, giving up if the consumer has stopped
+        while not stop.is_set():
             try:
-                # Try to decode and parse JSON to check if complete
-                decoded_data = full_data.decode('utf-8')
-                json.loads(decoded_data)
-                # If JSON parsing succeeds, process the data
-                logger.info(f"Received complete data from {client_address}: {decoded_data[:100]}... (total {len(decoded_data)} characters)")
-                payload = json.loads(decoded_data)
-                
-                # Check if payload contains schema and data
-                if isinstance(payload, dict) and 'schema' in payload and 'data' in payload:
-                    schema = payload['schema']
-                    rows = payload['data']
-                    # Apply schema before inserting data
-                    if apply_schema(db_connection, table_name, schema):
-                        logger.info(f"Schema applied successfully for table {table_name}.")
-                    else:
-                        logger.error(f"Failed to apply schema for table {table_name}.")
-                        return False
-                else:
-                    # Fallback to old behavior if payload is just a list of rows
-                    rows = payload
-                
-                # Insert each row into the database
-                for row in rows:
-                    if isinstance(row, dict):
-                        row_dict = row
-                    else:
-                        # Assuming row is a list/tuple, convert to dict based on schema if available
-                        row_dict = {}
-                        if 'schema' in locals():
-                            for i, col in enumerate(schema):
-                                if i < len(row):
-                                    row_dict[col['name']] = row[i]
-                        else:
-                            # Fallback to dummy column names
-                            row_dict = {
-                                "column1": row[0] if len(row) > 0 else None,
-                                "column2": row[1] if len(row) > 1 else None,
-                            }
-                    insert_row(db_connection, table_name, row_dict)
+                items.put(entry, timeout=0.1)
                 return True
-            except json.JSONDecodeError:
-                # Incomplete JSON, continue receiving
+            except queue.Full:
                 continue
-            except UnicodeDecodeError:
-                # Incomplete UTF-8 sequence, continue receiving
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+        except Exception as e:
+            put((False, e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+            put(None)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            entry = items.get()
+            if entry is None:
+                return
+            ok, value = entry
+            if not ok:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        producer.join()
+
+def load_concurrently(connections: list, table_name: str, payloads: Iterable) -> None:
+    """
+    Load payloads on a thread pool with one database connection per thread, so several batches are
+    copied into the table at once. At most len(connections) batches are in flight; further payloads
+    are not taken from the reader until a loader is free. Schema payloads are applied only after all
+    earlier batches have finished. Once a batch fails to load, no further batch is started and no more
+    payloads are taken; batches already loading alongside the failed one still finish.
+    
+    Parameters:
+    - connections (list): Connection objects to the PostgreSQL database, one per loader thread.
+    - table_name (str): The name of the table to insert data into.
+    - payloads: The decoded payloads, as yielded by iter_payloads.
+    """
+    idle = queue.Queue()
+    for connection in connections:
+        idle.put(connection)
+    slots = threading.BoundedSemaphore(len(connections))
+    failed = threading.Event()
+    
+    def load(payload, schema):
+        connection = idle.get()
+        try:
+            # Skip batches queued behind one that failed, so nothing after the failure is committed
+            if not failed.is_set() and not load_payload(connection, table_name, payload, schema):
+                failed.set()
+        finally:
+            idle.put(connection)
+            slots.release()
+    
+    schema = None
+    with ThreadPoolExecutor(max_workers=len(connections)) as executor:
+        for payload in payloads:
+            if isinstance(payload, dict) and 'schema' in payload:
+                # Drain the in-flight batches so the schema is not changed underneath them
+                for _ in connections:
+                    slots.acquire()
+                try:
+                    schema = payload['schema']
+                    if failed.is_set() or not load_payload(connections[0], table_name, payload, schema):
+                        break
+                finally:
+                    for _ in connections:
+                        slots.release()
                 continue
+            slots.acquire()
+            if failed.is_set():
+                slots.release()
+                break
+            executor.submit(load, payload, schema)
+
+def handle_client(client_socket: socket.socket, client_address: tuple, db_connection: psycopg2.extensions.connection, table_name: str, loader_connections: Optional[list] = None) -> None:
+    """
+    Receive messages from a client and insert them into the database until the client ends the sync,
+    disconnects or a message cannot be processed. A background thread receives and decodes up to
+    PIPELINE_DEPTH messages ahead while the current one is loaded, then the client socket is closed.
+    
+    Parameters:
+    - client_socket: The socket object for the client connection.
+    - client_address: The address of the connected client.
+    - db_connection: A connection object to the PostgreSQL database.
+    - table_name (str): The name of the table to insert data into.
+    - loader_connections (list): If more than one connection is given, batches are loaded concurrently with load_concurrently.
+    """
+    payloads = prefetch(iter_payloads(client_socket, client_address), PIPELINE_DEPTH)
+    schema = None
+    try:
+        if loader_connections and len(loader_connections) > 1:
+            load_concurrently(loader_connections, table_name, payloads)
+            return
+        for payload in payloads:
+            if isinstance(payload, dict) and 'schema' in payload:
+                schema = payload['schema']
+            if not load_payload(db_connection, table_name, payload, schema):
+                break
+    finally:
+        # Unblock the reader thread if it is still waiting for data before stopping it
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        payloads.close()
+        client_socket.close()
+
+def checkout_connections(connection_pool: ThreadedConnectionPool, count: int) -> list:
+    """
+    Take up to count connections from the pool for one client, e.g. LOADER_THREADS.
+    
+    Parameters:
+    - connection_pool: The pool returned by create_connection_pool.
+    - count (int): The number of connections wanted.
+    
+    Returns:
+    - list: The connections checked out; fewer than count (possibly none) if the pool is exhausted.
+    """
+    connections = []
+    for _ in range(count):
+        try:
+            connections.append(connection_pool.getconn())
+        except PoolError:
+            break
+    return connections
+
+def serve_client(client_socket: socket.socket, client_address: tuple, connection_pool: ThreadedConnectionPool, table_name: str) -> None:
+    """
+    Complete the TLS handshake with a newly accepted client, then handle it with connections checked out
+    of the pool, returning them when the client is done. Running the handshake here rather than in accept()
+    keeps a slow or stalled client from holding up the accept loop.
+    
+    Parameters:
+    - client_socket: The socket object for the client connection.
+    - client_address: The address of the connected client.
+    - connection_pool: The pool returned by create_connection_pool.
+    - table_name (str): The name of the table to insert data into.
+    """
+    try:
+        configure_client_socket(client_socket)
+        client_socket.settimeout(HANDSHAKE_TIMEOUT_SECONDS)
+        client_socket.do_handshake()
+        client_socket.settimeout(None)
+    except (ssl.SSLError, OSError) as e:
+        logger.error(f"TLS handshake with {client_address} failed: {e}")
+        client_socket.close()
+        return
+    logger.info(f"Secure connection established with {client_address} (TLS session resumed: {client_socket.session_reused})")
+    connections = checkout_connections(connection_pool, LOADER_THREADS)
+    try:
+        if not connections:
+            logger.error(f"No database connection available for {client_address}.")
+            client_socket.close()
+            return
+        handle_client(client_socket, client_address, connections[0], table_name, connections)
     except Exception as e:
-        logger.error(f"Error receiving data from {client_address}: {e}")
-        return False
+        logger.error(f"Error handling client {client_address}: {e}")
+    finally:
+        for connection in connections:
+            # Broken connections are discarded so the pool opens fresh ones instead
+            connection_pool.putconn(connection, close=bool(connection.closed))
+
+def serve_clients(server_socket: socket.socket, connection_pool: ThreadedConnectionPool, table_name: str, max_clients: int = 1) -> None:
+    """
+    Accept clients on a listening socket and insert the data they send until interrupted.
+    Up to max_clients clients are handled at once, each on its own thread with LOADER_THREADS
+    connections from the pool; further connections wait in the listen backlog.
+    
+    Parameters:
+    - server_socket: The listening socket returned by start_tcp_server.
+    - connection_pool: The pool returned by create_connection_pool.
+    - table_name (str): The name of the table to insert data into.
+    - max_clients (int): The maximum number of clients handled concurrently.
+    """
+    slots = threading.BoundedSemaphore(max_clients)
+    client_sockets = set()
+    client_sockets_lock = threading.Lock()
+    
+    def serve(client_socket, client_address):
+        try:
+            serve_client(client_socket, client_address, connection_pool, table_name)
+        finally:
+            with client_sockets_lock:
+                client_sockets.discard(client_socket)
+            slots.release()
+    
+    executor = ThreadPoolExecutor(max_workers=max_clients)
+    try:
+        while True:
+            # Only accept a connection once a handler is free to take it
+            slots.acquire()
+            try:
+                client_socket, client_address = server_socket.accept()
+            except BaseException:
+                slots.release()
+                raise
+            with client_sockets_lock:
+                client_sockets.add(client_socket)
+            executor.submit(serve, client_socket, client_address)
+    except BaseException:
+        # Handlers block in recv, so unblock them instead of waiting for their clients to finish
+        with client_sockets_lock:
+            for client_socket in client_sockets:
+                try:
+                    client_socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def run_worker(worker_id: int, table_name: str, pool_size: int = DB_POOL_MAX) -> None:
+    """
+    Run one receiver worker process with its own database connection pool and SO_REUSEPORT listening
+    socket, so parallel client shards are accepted, decoded and loaded on several cores.
+    
+    Parameters:
+    - worker_id (int): The number of the worker, used in log messages.
+    - table_name (str): The name of the table to insert data into.
+    - pool_size (int): The maximum number of database connections of the worker.
+    """
+    connection_pool = create_connection_pool(min(DB_POOL_MIN, pool_size), pool_size, host=os.getenv("TARGET_DB_HOST", "localhost"))
+    if not connection_pool:
+        logger.error(f"Worker {worker_id} failed to connect to the database on Host B.")
+        return
+    server_socket = start_tcp_server(reuse_port=True)
+    try:
+        if server_socket:
+            serve_clients(server_socket, connection_pool, table_name, max(1, pool_size // LOADER_THREADS))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Worker {worker_id} server error: {e}")
+    finally:
+        if server_socket:
+            server_socket.close()
+        connection_pool.closeall()
 
 # Example usage
 if __name__ == "__main__":
-    # Connect to the PostgreSQL database on Host B using environment variables or defaults
-    db_conn = connect_to_postgres(host=os.getenv("TARGET_DB_HOST", "localhost"))
+    table_name = os.getenv("TABLE_NAME", "your_table_name")
+    workers = int(os.getenv("SERVER_WORKERS", 1))  # Default to a single receiver
     
-    if db_conn:
-        server = start_tcp_server()
-        if server:
-            try:
-                while True:
-                    # Wait for a connection
-                    client_socket, client_address = server.accept()
-                    logger.info(f"Secure connection established with {client_address}")
-                    # Handle client data
-                    table_name = os.getenv("TABLE_NAME", "your_table_name")
-                    while handle_client_data(client_socket, client_address, db_conn, table_name):
-                        pass  # Continue receiving data until connection closes or error occurs
-                    client_socket.close()
-            except KeyboardInterrupt:
-                logger.info("\nShutting down TCP server...")
-                server.close()
-                db_conn.close()
-                logger.info("Database connection closed.")
-            except Exception as e:
-                logger.error(f"Server error: {e}")
-                server.close()
-                db_conn.close()
-                logger.info("Database connection closed.")
+    if workers > 1:
+        # Each worker process binds its own socket to the shared port; the kernel balances sharded client
+        # connections across them. DB_POOL_MAX is split between the workers.
+        # Workers are spawned rather than forked, so each starts its own log listener thread and TLS/database state
+        spawn = multiprocessing.get_context("spawn")
+        processes = [
+            spawn.Process(target=run_worker, args=(worker_id, table_name, max(1, DB_POOL_MAX // workers)), daemon=True)
+            for worker_id in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            logger.info("\nShutting down TCP server...")
+            for process in processes:
+                process.join()
     else:
-        logger.error("Failed to connect to the database on Host B.")
+        # Connect to the PostgreSQL database on Host B using environment variables or defaults
+        db_pool = create_connection_pool(host=os.getenv("TARGET_DB_HOST", "localhost"))
+        
+        if not db_pool:
+            logger.error("Failed to connect to the database on Host B.")
+        else:
+            server = start_tcp_server()
+            if server:
+                try:
+                    serve_clients(server, db_pool, table_name, max(1, DB_POOL_MAX // LOADER_THREADS))
+                except KeyboardInterrupt:
+                    logger.info("\nShutting down TCP server...")
+                except Exception as e:
+                    logger.error(f"Server error: {e}")
+                finally:
+                    server.close()
+            db_pool.closeall()
+            logger.info("Database connections closed.")
@@ -0,0 +1,99 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("dotenv")
+
+import db_sync_server
+
+
+def test_load_concurrently_stops_after_failed_batch(monkeypatch):
+    loaded = []
+    first_done = threading.Event()
+
+    def fake_load_payload(connection, table_name, payload, schema=None):
+        if payload["data"] == [[1]]:
+            first_done.set()
+            return False
+        loaded.append(payload["data"])
+        return True
+
+    def payloads():
+        yield {"data": [[1]]}
+        # Later batches arrive once the first one has failed
+        first_done.wait()
+        yield {"data": [[2]]}
+        yield {"data": [[3]]}
+
+    monkeypatch.setattr(db_sync_server, "load_payload", fake_load_payload)
+    # A single connection keeps the test deterministic: the failed batch releases it only after recording the failure
+    db_sync_server.load_concurrently([object()], "events", payloads())
+
+    assert loaded == []
+
+
+def test_load_concurrently_loads_every_batch(monkeypatch):
+    loaded = []
+    lock = threading.Lock()
+
+    def fake_load_payload(connection, table_name, payload, schema=None):
+        with lock:
+            loaded.append(payload["data"][0][0])
+        return True
+
+    monkeypatch.setattr(db_sync_server, "load_payload", fake_load_payload)
+    db_sync_server.load_concurrently([object(), object()], "events", ({"data": [[i]]} for i in range(10)))
+
+    assert sorted(loaded) == list(range(10))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, -1])
+def test_copy_lines_reader_reads_every_line(size):
+    lines = ["1\ta", "", "22\tlonger value", "3\tb"]
+    reader = db_sync_server.CopyLinesReader(lines)
+
+    chunks = []
+    while True:
+        chunk = reader.read(size)
+        if not chunk:
+            break
+        if size > 0:
+            assert len(chunk) <= size
+        chunks.append(chunk)
+
+    assert "".join(chunks) == "1\ta\n\n22\tlonger value\n3\tb\n"
+
+
+def test_dict_row_values_without_columns():
+    assert db_sync_server.dict_row_values([{}], []) == [[]]
+
+
+def test_dict_row_values_fills_missing_columns_with_none():
+    rows = [{"id": 1, "name": "a"}, {"id": 2}]
+
+    assert db_sync_server.dict_row_values(rows, ["id", "name"]) == [[1, "a"], [2, None]]
+
+
+class FakeSocket:
+    def __init__(self, data):
+        self._data = memoryview(data)
+
+    def recv_into(self, view, size):
+        received = min(size, len(self._data))
+        view[:received] = self._data[:received]
+        self._data = self._data[received:]
+        return received
+
+
+def test_receive_payload_rejects_oversized_zstd_content(monkeypatch):
+    decompressed = []
+    body = b"compressed body"
+    frame = db_sync_server.FRAME_HEADER.pack(db_sync_server.FLAG_ZSTD, len(body)) + body
+
+    monkeypatch.setattr(db_sync_server, "zstandard", SimpleNamespace(frame_content_size=lambda data: db_sync_server.MAX_FRAME_BYTES + 1))
+    monkeypatch.setattr(db_sync_server, "zstd_decompressor", lambda: decompressed.append(True))
+
+    assert db_sync_server.receive_payload(FakeSocket(frame), ("127.0.0.1", 5000)) is None
+    assert decompressed == []